@@ -10,16 +10,30 @@ except Exception:
     from types import SimpleNamespace
 
     settings = SimpleNamespace()
-import winpath
+try:
+    import winpath  # noqa: F401  (Windows only)
+except ImportError:
+    winpath = None
 import sys
 import subprocess
 import shutil
 import datetime
-import winreg
 import time
 from urllib.parse import urlparse
 import json
+import math
 import platform
+import abc
+import collections
+import contextlib
+import contextvars
+import hashlib
+import posixpath
+import re
+import threading
+import uuid
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
@@ -83,6 +97,103 @@ MAX_UPLOAD_SIZE_MB = _get_setting("max_upload_size_mb", 200)  # conservative def
 MAX_UPLOAD_ATTEMPTS = _get_setting("max_upload_attempts", 3)
 UPLOAD_BACKOFF_SECONDS = _get_setting("upload_backoff_seconds", 2)
 
+# Service loop cadence: regular interval, shortest pause while a backlog is
+# being drained and longest pause when idle or backing off.
+SERVICE_INTERVAL_SECONDS = _get_setting("service_interval_seconds", 300)
+SERVICE_INTERVAL_MIN_SECONDS = _get_setting("service_interval_min_seconds", 5)
+SERVICE_INTERVAL_MAX_SECONDS = _get_setting("service_interval_max_seconds", 3600)
+
+# Localhost status endpoint of the service (0 = disabled)
+STATUS_PORT = _get_setting("status_port", 0)
+
+# Upload integrity: verify what the server received before deleting sources,
+# and keep a ledger of shipped log contents so they are never sent twice.
+VERIFY_UPLOADS = _get_setting("verify_uploads", False)
+VERIFY_UPLOADS_STRICT = _get_setting("verify_uploads_strict", False)
+UPLOAD_LEDGER = _get_setting("upload_ledger", True)
+UPLOAD_LEDGER_RETENTION_DAYS = _get_setting("upload_ledger_retention_days", 90)
+
+# Parallel chunked transfer of large archives (Nextcloud chunking v2 protocol)
+PARALLEL_UPLOAD = _get_setting("parallel_upload", False)
+PARALLEL_UPLOAD_CONNECTIONS = _get_setting("parallel_upload_connections", 4)
+PARALLEL_UPLOAD_CHUNK_MB = _get_setting("parallel_upload_chunk_mb", 10)
+CHUNK_UPLOAD_URL = _get_setting("chunk_upload_url", "")
+
+# How long a transport that worked is trusted before probing again
+TRANSPORT_CACHE_TTL_HOURS = _get_setting("transport_cache_ttl_hours", 24)
+
+# Settings XML changes as compact diffs against the last uploaded version,
+# with a full snapshot every N changes (or when the diff is not smaller)
+SETTINGS_DIFF_UPLOAD = _get_setting("settings_diff_upload", False)
+SETTINGS_FULL_SNAPSHOT_EVERY = _get_setting("settings_full_snapshot_every", 10)
+
+# A log is uploaded only after its size and mtime were unchanged this long
+FILE_QUIET_SECONDS = _get_setting("file_quiet_seconds", 120)
+
+# Cross-process leases (CLI vs. service): a held lease is renewed in the
+# background and taken over when its owner died or stopped renewing it
+LEASE_TTL_SECONDS = _get_setting("lease_ttl_seconds", 120)
+
+# Pick the zip codec/level per file from measured compression speed, ratio
+# and uplink throughput (learned per instrument)
+COMPRESSION_AUTOTUNE = _get_setting("compression_autotune", False)
+COMPRESSION_CANDIDATES = _get_setting(
+    "compression_candidates", ("stored", "deflate1", "deflate6", "deflate9")
+)
+COMPRESSION_REPROBE_FILES = _get_setting("compression_reprobe_files", 50)
+
+# Resource governor for acquisition PCs: lower CPU/IO priority, cap
+# concurrent compressions and pause ("pause") or throttle ("slow") log
+# uploads while the instrument is acquiring (recent writes in Logs or the
+# activity file being present)
+GOVERNOR = _get_setting("governor", False)
+GOVERNOR_LOW_PRIORITY = _get_setting("governor_low_priority", True)
+GOVERNOR_COMPRESSION_THREADS = _get_setting("governor_compression_threads", 1)
+GOVERNOR_ACTIVITY_SECONDS = _get_setting("governor_activity_seconds", 60)
+GOVERNOR_ACTIVITY_FILE = _get_setting("governor_activity_file", "")
+GOVERNOR_ACTIVE_MODE = _get_setting("governor_active_mode", "pause")
+GOVERNOR_SLOW_READ_MBPS = _get_setting("governor_slow_read_mbps", 10.0)
+GOVERNOR_SLOW_FILE_DELAY_SECONDS = _get_setting("governor_slow_file_delay_seconds", 5.0)
+
+# Upload a compact digest of every log (error/warning lines, message template
+# counts, first/last timestamp) before the full archives of a cycle
+LOG_DIGEST = _get_setting("log_digest", False)
+LOG_DIGEST_MAX_LINES = _get_setting("log_digest_max_lines", 500)
+LOG_DIGEST_MAX_TEMPLATES = _get_setting("log_digest_max_templates", 200)
+
+# Local log files of the service/daemon (JSON lines, rotated by size; default
+# <state dir>/logs) and how often a summary goes to the Windows Event Log
+LOG_DIR = _get_setting("log_dir", "")
+LOG_MAX_BYTES = _get_setting("log_max_bytes", 5 * 1024 * 1024)
+LOG_BACKUP_COUNT = _get_setting("log_backup_count", 5)
+LOG_QUEUE_SIZE = _get_setting("log_queue_size", 10000)
+EVENTLOG_SUMMARY_SECONDS = _get_setting("eventlog_summary_seconds", 300)
+
+# Per-stage cProfile/tracemalloc recording (also enabled by --profile)
+PROFILE = _get_setting("profile", False)
+PROFILE_KEEP_RUNS = _get_setting("profile_keep_runs", 10)
+
+# Remote layout: "flat" (all files in the share root, compatible naming) or
+# "partitioned" (<serial>/<YYYY>/<MM>/<file>, collections created once)
+REMOTE_LAYOUT = _get_setting("remote_layout", "flat")
+
+# Multi-root mode: several instrument data folders served by one uploader.
+# Entries are paths or dicts {"path": ..., "serial": ..., "machine_id": ...}
+# (serial defaults to the root's LastOpenSerial.txt, machine_id to this PC's).
+# Roots run concurrently; every root ships at most root_files_per_cycle logs
+# per cycle (0 = no limit) so a large backlog cannot starve the others.
+DATA_ROOTS = _get_setting("data_roots", [])
+MULTI_ROOT_WORKERS = _get_setting("multi_root_workers", 4)
+ROOT_FILES_PER_CYCLE = _get_setting("root_files_per_cycle", 0)
+# Shared by all roots: concurrent uploads and average upload rate (0 = no limit)
+SHARED_UPLOAD_CONNECTIONS = _get_setting("shared_upload_connections", 4)
+BANDWIDTH_LIMIT_KBPS = _get_setting("bandwidth_limit_kbps", 0)
+
+# Upload destination: "nextcloud" (public share), "local" (directory, e.g. an
+# SMB/NAS staging share) or "memory" (offline tests and benchmarks)
+UPLOAD_BACKEND = _get_setting("upload_backend", "nextcloud")
+LOCAL_BACKEND_DIR = _get_setting("local_backend_dir", "")
+
 
 def _too_large(path):
     try:
@@ -145,8 +256,36 @@ def _client_version_state_dir() -> str:
     return path
 
 
+_active_root = contextvars.ContextVar("loguploader_active_root", default="")
+
+
+@contextlib.contextmanager
+def root_context(key: str):
+    """Keep per-instrument state (see _root_state_dir) of data root key while active."""
+    token = _active_root.set(key)
+    try:
+        yield
+    finally:
+        _active_root.reset(token)
+
+
+def _root_state_dir() -> str:
+    """State folder of the active data root; the shared state folder in single-root mode.
+
+    Heartbeat marker, daily statistics, scan index and settings baselines are
+    per instrument; ledger, transport and collection caches describe the
+    shared server and stay in the shared folder.
+    """
+    key = _active_root.get()
+    if not key:
+        return _client_version_state_dir()
+    path = os.path.join(_client_version_state_dir(), "roots", key)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 def _client_version_marker_path() -> str:
-    return os.path.join(_client_version_state_dir(), "client_version_last_upload.txt")
+    return os.path.join(_root_state_dir(), "client_version_last_upload.txt")
 
 
 def _should_upload_client_version_today(day_yyyymmdd: str) -> bool:
@@ -198,37 +337,217 @@ def did_any_upload_succeed(returntxt: str) -> bool:
     return "Uploaded:" in (returntxt or "")
 
 
+def did_any_upload_fail(returntxt: str) -> bool:
+    # Upload functions append "Upload Failed ..." per file, or "Connection failed"
+    # when no client could be created at all.
+    txt = returntxt or ""
+    return "Upload Failed" in txt or "Connection failed" in txt
+
+
+def backlog_stats(basepath=""):
+    """Return (files, bytes) of log files below basepath still waiting for upload."""
+    if not os.path.isdir(basepath):
+        return 0, 0
+    pending = glob.glob(os.path.join(basepath, "Logs", "*.pqlog"))
+    pending += glob.glob(os.path.join(basepath, "LaserPower.log"))
+    total = 0
+    for path in pending:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return len(pending), total
+
+
+def count_backlog(basepath="") -> int:
+    """Number of log files below basepath that are still waiting for upload."""
+    return backlog_stats(basepath)[0]
+
+
+def next_service_interval(
+    uploaded: bool,
+    failed: bool,
+    backlog: int,
+    consecutive_failures: int = 0,
+) -> float:
+    """Pick the pause before the next service cycle from the last cycle's outcome.
+
+    - uploads went through and files are still pending: drain back-to-back
+    - nothing went through and uploads failed: exponential backoff
+    - nothing to do at all: relax to the long idle interval
+    - otherwise (e.g. logs still waiting to become quiet): regular interval
+    """
+    lo = max(0.0, float(SERVICE_INTERVAL_MIN_SECONDS))
+    hi = max(lo, float(SERVICE_INTERVAL_MAX_SECONDS))
+    base = min(max(float(SERVICE_INTERVAL_SECONDS), lo), hi)
+
+    if uploaded and backlog > 0:
+        return lo
+    if failed and not uploaded:
+        exponent = min(max(consecutive_failures - 1, 0), 16)
+        return min(hi, base * (2 ** exponent))
+    if not uploaded and not failed and backlog == 0:
+        return hi
+    return base
+
+
+def _tmp_path(path: str) -> str:
+    """Temporary name for an atomic write of path, unique per process and thread."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+# --- Daily statistics carried by the client_version heartbeat ---
+_STATS_LATENCY_SAMPLES = 500
+_STATS_KEEP_DAYS = 31
+_daily_stats_lock = threading.Lock()
+
+
+def _daily_stats_path() -> str:
+    return os.path.join(_root_state_dir(), "daily_stats.json")
+
+
+def _load_daily_stats() -> dict:
+    try:
+        with open(_daily_stats_path(), "r", encoding="utf-8") as f:
+            stats = json.load(f)
+        return stats if isinstance(stats, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_daily_stats(stats: dict) -> None:
+    # Days that could not be reported for a month are dropped
+    for day in sorted(stats)[:-_STATS_KEEP_DAYS]:
+        del stats[day]
+    path = _daily_stats_path()
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stats, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _update_daily_stats(update) -> None:
+    """Apply update(counters) to today's counters and persist them."""
+    day = datetime.datetime.utcnow().strftime("%Y%m%d")
+    try:
+        with _daily_stats_lock:
+            stats = _load_daily_stats()
+            counters = stats.setdefault(day, {})
+            update(counters)
+            _save_daily_stats(stats)
+    except Exception:
+        # Statistics are informational; never fail a stage because of them
+        pass
+
+
+def daily_stats_record_upload(source_bytes: int, shipped_bytes: int, seconds: float, ok: bool) -> None:
+    """Count one upload attempt of a stage for today's heartbeat."""
+
+    def update(c):
+        if not ok:
+            c["upload_failures"] = c.get("upload_failures", 0) + 1
+            return
+        n = c.get("files_uploaded", 0)
+        c["files_uploaded"] = n + 1
+        c["source_bytes"] = c.get("source_bytes", 0) + int(source_bytes)
+        c["shipped_bytes"] = c.get("shipped_bytes", 0) + int(shipped_bytes)
+        samples = c.setdefault("latencies_s", [])
+        if len(samples) < _STATS_LATENCY_SAMPLES:
+            samples.append(round(seconds, 3))
+        else:
+            # Keep the most recent uploads once the sample buffer is full
+            samples[n % _STATS_LATENCY_SAMPLES] = round(seconds, 3)
+
+    _update_daily_stats(update)
+
+
+def daily_stats_record_cycle(uploaded: bool, failed: bool, backlog_files: int, backlog_bytes: int) -> None:
+    """Count one finished cycle (service or CLI) for today's heartbeat."""
+
+    def update(c):
+        c["cycles"] = c.get("cycles", 0) + 1
+        if failed and not uploaded:
+            c["cycles_failed"] = c.get("cycles_failed", 0) + 1
+        c["backlog_files"] = int(backlog_files)
+        c["backlog_bytes"] = int(backlog_bytes)
+        c["backlog_files_max"] = max(c.get("backlog_files_max", 0), int(backlog_files))
+
+    _update_daily_stats(update)
+
+
+def _percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    rank = min(max(math.ceil(fraction * len(sorted_values)), 1), len(sorted_values))
+    return sorted_values[rank - 1]
+
+
+def summarize_daily_stats(counters: dict) -> dict:
+    """Compact heartbeat form of one day's counters."""
+    latencies = sorted(counters.get("latencies_s", []))
+    source = counters.get("source_bytes", 0)
+    shipped = counters.get("shipped_bytes", 0)
+    return {
+        "cycles": counters.get("cycles", 0),
+        "cycles_failed": counters.get("cycles_failed", 0),
+        "files_uploaded": counters.get("files_uploaded", 0),
+        "upload_failures": counters.get("upload_failures", 0),
+        "source_bytes": source,
+        "shipped_bytes": shipped,
+        "compression_ratio": round(shipped / source, 4) if source else None,
+        "upload_p50_s": _percentile(latencies, 0.50),
+        "upload_p95_s": _percentile(latencies, 0.95),
+        "backlog_files": counters.get("backlog_files", 0),
+        "backlog_bytes": counters.get("backlog_bytes", 0),
+        "backlog_files_max": counters.get("backlog_files_max", 0),
+    }
+
+
 def upload_client_version_if_needed(
     serialnumber: str,
     current_machine_id: str,
 ) -> str:
+    """Send the daily heartbeat: client/OS version plus per-day upload statistics.
+
+    The heartbeat carries the counters of every finished day not reported yet
+    and today's counters so far; it is uploaded from memory once per day.
+    """
     day = datetime.datetime.utcnow().strftime("%Y%m%d")
     if not _should_upload_client_version_today(day):
         return "client_version: already uploaded today\n"
 
     payload = _build_client_version_payload(serialnumber, current_machine_id)
+    with _daily_stats_lock:
+        stats = _load_daily_stats()
+    finished = sorted(d for d in stats if d < day)
+    payload["stats"] = {
+        "today": dict(summarize_daily_stats(stats.get(day, {})), day=day, partial=True),
+        "days": {d: summarize_daily_stats(stats[d]) for d in finished},
+    }
     remote_name = f"{serialnumber}_{current_machine_id}_client_version_{day}.json"
-
-    local_path = os.path.join(_client_version_state_dir(), remote_name)
-    try:
-        with open(local_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, sort_keys=True)
-            f.write("\n")
-    except Exception as e:
-        return f"client_version: failed to write json ({type(e).__name__}: {e})\n"
+    data = (json.dumps(payload, separators=(",", ":"), sort_keys=True) + "\n").encode("utf-8")
 
     try:
-        # Use direct public DAV upload (same drop folder)
-        _public_dav_put_file(local_path, remote_name)
+        # Same drop folder as the logs
+        backend = get_backend()
+        if not backend.connect():
+            return "client_version: Connection failed\n"
+        backend.put_bytes(data, _remote_name(remote_name, serialnumber))
         _mark_client_version_uploaded(day)
-        return f"client_version: uploaded {remote_name}\n"
     except Exception as e:
         return f"client_version: upload failed ({type(e).__name__}: {e})\n"
-    finally:
+
+    if finished:
         try:
-            os.remove(local_path)
+            with _daily_stats_lock:
+                stats = _load_daily_stats()
+                for d in finished:
+                    stats.pop(d, None)
+                _save_daily_stats(stats)
         except Exception:
             pass
+    return f"client_version: uploaded {remote_name}\n"
 
 
 def _get_public_link() -> str:
@@ -240,46 +559,1736 @@ def _get_public_link() -> str:
     return link
 
 
-def _public_dav_put_file(local_path: str, remote_name: str) -> None:
+def _public_dav_url(remote_name: str):
+    """Return (url, token) of remote_name inside the public share's DAV root."""
     public_link = _get_public_link()
     token = _public_share_token_from_link(public_link)
     base = _public_share_base_url_from_link(public_link)
-    url = f"{base}/public.php/dav/files/{token}/{remote_name}"
+    return f"{base}/public.php/dav/files/{token}/{remote_name}", token
+
+
+def _public_dav_put_file(local_path: str, remote_name: str, sha256: str = ""):
+    url, token = _public_dav_url(remote_name)
+    headers = {"X-Requested-With": "XMLHttpRequest"}
+    if sha256:
+        # Nextcloud stores the client checksum and reports it via oc:checksums
+        headers["OC-Checksum"] = f"SHA256:{sha256}"
     with open(local_path, "rb") as f:
         r = requests.put(
             url,
             data=f,
             auth=(token, ""),
-            headers={"X-Requested-With": "XMLHttpRequest"},
+            headers=headers,
             timeout=60,
         )
     if r.status_code not in (200, 201, 204):
         raise RuntimeError(f"public DAV upload failed: HTTP {r.status_code} {r.text}")
+    return r
+
 
+_chunk_sessions = threading.local()
 
-def _drop_with_retries(nc, path):
-    """Try nc.drop_file(path) with retries and backoff. Returns (ok, attempts, last_error)."""
+
+def _chunk_session() -> requests.Session:
+    # One keep-alive connection per worker thread
+    session = getattr(_chunk_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        _chunk_sessions.session = session
+    return session
+
+
+def _public_dav_put_file_chunked(local_path: str, remote_name: str, sha256: str = ""):
+    """Upload local_path in chunks over several parallel connections.
+
+    Follows the Nextcloud chunking v2 protocol: MKCOL an upload collection,
+    PUT numbered chunks into it concurrently, then MOVE the virtual ".file"
+    onto the destination so the server assembles the archive.
+    """
+    dest_url, token = _public_dav_url(remote_name)
+    if CHUNK_UPLOAD_URL:
+        upload_root = CHUNK_UPLOAD_URL.rstrip("/")
+    else:
+        base = _public_share_base_url_from_link(_get_public_link())
+        upload_root = f"{base}/public.php/dav/uploads/{token}"
+    upload_url = f"{upload_root}/loguploader-{uuid.uuid4().hex}"
+
+    size = os.path.getsize(local_path)
+    chunk_size = max(1, int(float(PARALLEL_UPLOAD_CHUNK_MB) * 1024 * 1024))
+    headers = {
+        "X-Requested-With": "XMLHttpRequest",
+        "Destination": dest_url,
+        "OC-Total-Length": str(size),
+    }
+    auth = (token, "")
+
+    r = requests.request("MKCOL", upload_url, auth=auth, headers=headers, timeout=60)
+    if r.status_code not in (200, 201):
+        raise RuntimeError(f"chunked upload MKCOL failed: HTTP {r.status_code}")
+
+    def put_chunk(number_offset):
+        number, offset = number_offset
+        with open(local_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(chunk_size)
+        rc = _chunk_session().put(
+            f"{upload_url}/{number:05d}", data=data, auth=auth, headers=headers, timeout=60
+        )
+        if rc.status_code not in (200, 201, 204):
+            raise RuntimeError(f"chunk {number} upload failed: HTTP {rc.status_code}")
+
+    try:
+        chunks = [(i + 1, off) for i, off in enumerate(range(0, size, chunk_size))]
+        workers = max(1, min(int(PARALLEL_UPLOAD_CONNECTIONS), len(chunks)))
+        if governor().slowed:
+            # One connection at a time while the instrument is acquiring
+            workers = 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(put_chunk, chunks))
+
+        move_headers = dict(headers)
+        if sha256:
+            move_headers["OC-Checksum"] = f"SHA256:{sha256}"
+        r = requests.request(
+            "MOVE", f"{upload_url}/.file", auth=auth, headers=move_headers, timeout=300
+        )
+        if r.status_code not in (200, 201, 204):
+            raise RuntimeError(f"chunked upload MOVE failed: HTTP {r.status_code}")
+    except Exception:
+        try:
+            requests.delete(upload_url, auth=auth, headers=headers, timeout=60)
+        except Exception:
+            pass
+        raise
+    return r
+
+
+def _use_chunked_upload(path: str) -> bool:
+    if not PARALLEL_UPLOAD:
+        return False
+    try:
+        return os.path.getsize(path) > float(PARALLEL_UPLOAD_CHUNK_MB) * 1024 * 1024
+    except OSError:
+        return False
+
+
+# --- Transport negotiation: remember which upload method works ---
+_TRANSPORTS = ("pyncclient", "public_dav")
+_transport_cache = None
+_transport_lock = threading.Lock()
+
+
+def _transport_cache_path() -> str:
+    return os.path.join(_client_version_state_dir(), "transport_cache.json")
+
+
+def _load_transport_cache() -> dict:
+    global _transport_cache
+    if _transport_cache is None:
+        try:
+            with open(_transport_cache_path(), "r", encoding="utf-8") as f:
+                _transport_cache = json.load(f)
+        except Exception:
+            _transport_cache = {}
+        _transport_cache.setdefault("preferred", None)
+        _transport_cache.setdefault("probed", 0)
+        _transport_cache.setdefault("stats", {})
+    return _transport_cache
+
+
+def _save_transport_cache() -> None:
+    try:
+        path = _transport_cache_path()
+        tmp = _tmp_path(path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_transport_cache, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _transport_order() -> list:
+    """Transports to try, the remembered working one first while it is fresh."""
+    with _transport_lock:
+        cache = _load_transport_cache()
+        preferred = cache["preferred"]
+        fresh = time.time() - cache["probed"] < float(TRANSPORT_CACHE_TTL_HOURS) * 3600
+        if preferred in _TRANSPORTS and fresh:
+            return [preferred] + [t for t in _TRANSPORTS if t != preferred]
+        return list(_TRANSPORTS)
+
+
+def _record_transport(name: str, ok: bool, seconds: float, negotiate: bool = True) -> None:
+    with _transport_lock:
+        cache = _load_transport_cache()
+        st = cache["stats"].setdefault(name, {"ok": 0, "failed": 0, "total_s": 0.0, "last_s": None})
+        if ok:
+            st["ok"] += 1
+            st["total_s"] += seconds
+            st["last_s"] = round(seconds, 3)
+        else:
+            st["failed"] += 1
+        if negotiate:
+            fresh = time.time() - cache["probed"] < float(TRANSPORT_CACHE_TTL_HOURS) * 3600
+            if ok and (cache["preferred"] != name or not fresh):
+                cache["preferred"] = name
+                cache["probed"] = time.time()
+            elif not ok and cache["preferred"] == name:
+                # Forget it so the next upload probes all transports again
+                cache["preferred"] = None
+        _save_transport_cache()
+
+
+def _chunked_upload_allowed() -> bool:
+    """False for transport_cache_ttl_hours after chunking failed where a plain PUT then worked."""
+    with _transport_lock:
+        failed = _load_transport_cache().get("chunked_failed", 0)
+        return time.time() - failed >= float(TRANSPORT_CACHE_TTL_HOURS) * 3600
+
+
+def _record_chunked_support(ok: bool) -> None:
+    with _transport_lock:
+        cache = _load_transport_cache()
+        failed = 0 if ok else time.time()
+        if cache.get("chunked_failed", 0) != failed:
+            cache["chunked_failed"] = failed
+            _save_transport_cache()
+
+
+def transport_stats() -> dict:
+    """Per-transport success/failure counts and mean upload latency, plus the preferred transport."""
+    with _transport_lock:
+        cache = _load_transport_cache()
+        stats = {}
+        for name, st in cache["stats"].items():
+            stats[name] = {
+                "ok": st["ok"],
+                "failed": st["failed"],
+                "mean_s": round(st["total_s"] / st["ok"], 3) if st["ok"] else None,
+                "last_s": st["last_s"],
+            }
+        return {"preferred": cache["preferred"], "transports": stats}
+
+
+def _send_via(transport: str, nc, path: str, remote_name: str, sha256: str = "") -> None:
+    if transport == "pyncclient":
+        if not nc.drop_file(path):
+            raise RuntimeError("drop_file returned False")
+    else:
+        _public_dav_put_file(path, remote_name, sha256)
+
+
+def _drop_with_retries(nc, path, sha256="", remote_name=None):
+    """Upload path with retries and backoff. Returns (ok, attempts, last_error).
+
+    Transports are tried in the order of _transport_order(), so once one has
+    worked every later file goes straight through it.
+    """
+    remote_name = remote_name or os.path.basename(path)
+    # drop_file can only place files in the share root under their own name
+    transports = [
+        t for t in _transport_order() if t != "pyncclient" or remote_name == os.path.basename(path)
+    ]
     attempts = 0
     last_error = None
     while attempts < MAX_UPLOAD_ATTEMPTS:
         attempts += 1
+        chunk_error = None
+        if _use_chunked_upload(path) and _chunked_upload_allowed():
+            t0 = time.perf_counter()
+            try:
+                _public_dav_put_file_chunked(path, remote_name, sha256)
+                _record_transport("chunked", True, time.perf_counter() - t0, negotiate=False)
+                _record_chunked_support(True)
+                return True, attempts, None
+            except Exception as e:
+                # Server may not offer chunked uploads on public shares; fall back below
+                _record_transport("chunked", False, time.perf_counter() - t0, negotiate=False)
+                chunk_error = f"{type(e).__name__}: {e}"
+        errors = []
+        for transport in transports:
+            t0 = time.perf_counter()
+            try:
+                _send_via(transport, nc, path, remote_name, sha256)
+            except Exception as e:
+                _record_transport(transport, False, time.perf_counter() - t0)
+                errors.append(f"{transport}: {type(e).__name__}: {e}")
+                continue
+            _record_transport(transport, True, time.perf_counter() - t0)
+            if chunk_error:
+                # The share takes files but not chunked uploads: stop probing it until the TTL
+                _record_chunked_support(False)
+            note = None
+            if errors:
+                note = "; ".join(errors) + f"; uploaded via {transport}"
+            return True, attempts, note
+        last_error = "; ".join(errors)
+        if chunk_error:
+            last_error = f"chunked: {chunk_error}; {last_error}"
+        if attempts < MAX_UPLOAD_ATTEMPTS:
+            time.sleep(UPLOAD_BACKOFF_SECONDS)
+    return False, attempts, last_error
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# zip codecs the uploader can produce: name -> (compress_type, compresslevel)
+ZIP_CODECS = {
+    "stored": (zipfile.ZIP_STORED, None),
+    "deflate1": (zipfile.ZIP_DEFLATED, 1),
+    "deflate6": (zipfile.ZIP_DEFLATED, 6),
+    "deflate9": (zipfile.ZIP_DEFLATED, 9),
+    "bzip2": (zipfile.ZIP_BZIP2, 9),
+    "lzma": (zipfile.ZIP_LZMA, None),
+}
+DEFAULT_ZIP_CODEC = "deflate6"
+
+
+def _zip_file(source: str, zipfilename: str, codec: str = DEFAULT_ZIP_CODEC, timing: dict = None) -> str:
+    """Compress source into a single-entry zip and return the source's SHA-256.
+
+    The digest is computed from the same chunks that are fed to the compressor,
+    so the source is read only once. timing["seconds"], if given, receives the
+    compression time without waiting for a slot or governor read pacing.
+    """
+    h = hashlib.sha256()
+    compress_type, level = ZIP_CODECS[codec]
+    zinfo = zipfile.ZipInfo.from_file(source, basename(source))
+    zinfo.compress_type = compress_type
+    # ZipFile.open() takes the level from the ZipInfo (attribute renamed in Python 3.13)
+    try:
+        zinfo.compress_level = level
+    except AttributeError:
+        zinfo._compresslevel = level
+    gov = governor()
+    with gov.compression_slot():
+        t0 = time.perf_counter()
+        paced = 0.0
+        with zipfile.ZipFile(zipfilename, "w") as zipObj:
+            with open(source, "rb") as src, zipObj.open(zinfo, "w") as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+                    paced += gov.throttle_read(len(chunk))
+        if timing is not None:
+            timing["seconds"] = time.perf_counter() - t0 - paced
+    return h.hexdigest()
+
+
+_upload_ledger_lock = threading.Lock()
+
+
+def _upload_ledger_path() -> str:
+    return os.path.join(_client_version_state_dir(), "upload_ledger.json")
+
+
+def _load_upload_ledger() -> dict:
+    try:
+        with open(_upload_ledger_path(), "r", encoding="utf-8") as f:
+            ledger = json.load(f)
+        return ledger if isinstance(ledger, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_upload_ledger(ledger: dict) -> None:
+    cutoff = time.time() - float(UPLOAD_LEDGER_RETENTION_DAYS) * 86400
+    ledger = {k: v for k, v in ledger.items() if v.get("time", 0) >= cutoff}
+    path = _upload_ledger_path()
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ledger, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def ledger_has_upload(remote_name: str, source: str) -> bool:
+    """True if source's content was already uploaded as remote_name (and verified, if enabled).
+
+    Entries are keyed by the remote name, so identical content under another
+    name (empty logs, an unchanged LaserPower.log) is still sent. The source is
+    only hashed when its remote name is in the ledger.
+    """
+    if not UPLOAD_LEDGER:
+        return False
+    entry = _load_upload_ledger().get(remote_name)
+    if not isinstance(entry, dict) or not entry.get("sha256"):
+        return False
+    try:
+        return entry["sha256"] == _file_sha256(source)
+    except OSError:
+        return False
+
+
+def ledger_record_upload(remote_name: str, digest: str, size: int, verified: bool) -> None:
+    if not UPLOAD_LEDGER or not digest:
+        return
+    try:
+        # Roots upload concurrently; keep load-modify-save atomic
+        with _upload_ledger_lock:
+            ledger = _load_upload_ledger()
+            ledger[remote_name] = {
+                "sha256": digest,
+                "size": size,
+                "verified": verified,
+                "time": time.time(),
+            }
+            _save_upload_ledger(ledger)
+    except Exception:
+        # The ledger is an optimisation; never fail an upload because of it
+        pass
+
+
+_PROPFIND_BODY = (
+    '<?xml version="1.0"?>'
+    '<d:propfind xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+    "<d:prop><d:getcontentlength/><oc:checksums/></d:prop>"
+    "</d:propfind>"
+)
+
+
+def _remote_file_info(remote_name: str):
+    """Ask the share what it holds under remote_name.
+
+    Returns (size, checksums) where size is None if the share does not reveal it
+    (file-drop shares usually hide their content) and checksums is a list of
+    "ALGO:hex" strings.
+    """
+    url, token = _public_dav_url(remote_name)
+    headers = {"X-Requested-With": "XMLHttpRequest", "Depth": "0"}
+    r = requests.request(
+        "PROPFIND", url, data=_PROPFIND_BODY, auth=(token, ""), headers=headers, timeout=60
+    )
+    if r.status_code == 207:
+        root = ET.fromstring(r.content)
+        size = None
+        el = root.find(".//{DAV:}getcontentlength")
+        if el is not None and (el.text or "").strip().isdigit():
+            size = int(el.text.strip())
+        checksums = []
+        for el in root.iter("{http://owncloud.org/ns}checksum"):
+            checksums.extend((el.text or "").split())
+        return size, checksums
+
+    r = requests.head(url, auth=(token, ""), headers=headers, timeout=60)
+    if r.status_code == 200 and r.headers.get("Content-Length", "").isdigit():
+        return int(r.headers["Content-Length"]), []
+    return None, []
+
+
+def _verify_remote_upload(backend, path: str, remote_name: str, sha256: str = ""):
+    """Compare the backend's copy of remote_name with the local file.
+
+    Returns (verified, note). A share that does not reveal size or checksum
+    counts as verified unless verify_uploads_strict is set; the successful PUT
+    is then the only evidence we have.
+    """
+    try:
+        size, checksums = backend.remote_info(remote_name)
+    except Exception as e:
+        return (not VERIFY_UPLOADS_STRICT), f"verify failed ({type(e).__name__}: {e})"
+    if size is None:
+        return (not VERIFY_UPLOADS_STRICT), "remote size not visible"
+    local_size = os.path.getsize(path)
+    if size != local_size:
+        return False, f"size mismatch (remote={size}, local={local_size})"
+    for c in checksums:
+        algo, _, value = c.partition(":")
+        if sha256 and algo.upper() == "SHA256" and value.lower() != sha256.lower():
+            return False, "checksum mismatch"
+    return True, None
+
+
+# --- File quiescence: upload files only once they stopped changing ---
+_scan_indexes = {}
+_scan_index_lock = threading.Lock()
+
+
+def _scan_index_path() -> str:
+    return os.path.join(_root_state_dir(), "scan_index.json")
+
+
+def _load_scan_index() -> dict:
+    path = _scan_index_path()
+    if path not in _scan_indexes:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                _scan_indexes[path] = json.load(f)
+        except Exception:
+            _scan_indexes[path] = {}
+    return _scan_indexes[path]
+
+
+def _save_scan_index() -> None:
+    try:
+        path = _scan_index_path()
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(_scan_indexes.get(path, {}), f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+    except Exception:
+        pass
+
+
+def _quiescent_files(paths, scope: str):
+    """Split paths into (ready, waiting) by how long each has been unchanged.
+
+    The scan index remembers (size, mtime) of every file of a scope and since
+    when that pair was seen. A file is ready once it has not changed for
+    file_quiet_seconds, judged by our own observations or, on first sight,
+    by its mtime. Unlike an open-file probe this works the same on every
+    platform and never picks up a half-written log.
+    """
+    now = time.time()
+    quiet = float(FILE_QUIET_SECONDS)
+    ready, waiting = [], []
+    with _scan_index_lock:
+        index = _load_scan_index()
+        previous = index.get(scope, {})
+        current = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entry = previous.get(path)
+            if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                since = entry["since"]
+            else:
+                # New or changed: unchanged since its last write at the latest
+                since = min(now, st.st_mtime) if entry is None else now
+            current[path] = {"size": st.st_size, "mtime": st.st_mtime, "since": since}
+            (ready if now - since >= quiet else waiting).append(path)
+        index[scope] = current
+        _save_scan_index()
+    return ready, waiting
+
+
+# --- Log digests: errors and message statistics ahead of the full log ---
+LOG_DIGEST_FORMAT = "loguploader-log-digest/1"
+_DIGEST_TRACKED_TEMPLATES = 5000
+_DIGEST_LINE_CHARS = 500
+_TIMESTAMP_RE = re.compile(r"^\s*\[?(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)\]?")
+_LEVEL_RE = re.compile(r"[\[\s|<](FATAL|CRITICAL|ERROR|ERR|WARNING|WARN|INFO|DEBUG|TRACE|VERBOSE)[\]\s|>:]")
+_KEYWORD_RE = re.compile(r"\b(fatal|error|exception|failed|warning)\b", re.IGNORECASE)
+_TEMPLATE_SUBS = (
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "<guid>"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "<hex>"),
+    (re.compile(r"\"[^\"]*\"|'[^']*'"), "<str>"),
+    (re.compile(r"(?:[A-Za-z]:)?[\\/][^\s:;,]+"), "<path>"),
+    (re.compile(r"[-+]?\d+(?:[.,]\d+)?"), "<n>"),
+)
+_LEVEL_NAMES = {"FATAL": "error", "CRITICAL": "error", "ERROR": "error", "ERR": "error", "WARNING": "warning", "WARN": "warning"}
+
+
+def _log_line_level(line: str, rest: str) -> str:
+    """'error', 'warning' or 'info' from the line's level field, else from keywords."""
+    m = _LEVEL_RE.search(" " + rest[:64])
+    if m:
+        return _LEVEL_NAMES.get(m.group(1), "info")
+    m = _KEYWORD_RE.search(line)
+    if m:
+        return "warning" if m.group(1).lower() == "warning" else "error"
+    return "info"
+
+
+def _message_template(message: str) -> str:
+    for pattern, placeholder in _TEMPLATE_SUBS:
+        message = pattern.sub(placeholder, message)
+    return message.strip()[:200]
+
+
+def _open_log_text(path: str):
+    with open(path, "rb") as f:
+        head = f.read(2)
+    encoding = "utf-16" if head in (b"\xff\xfe", b"\xfe\xff") else "utf-8-sig"
+    return open(path, "r", encoding=encoding, errors="replace", newline=None)
+
+
+def extract_log_digest(path: str) -> dict:
+    """One streaming pass over a log: error/warning lines, template counts, time range.
+
+    Memory stays bounded: at most log_digest_max_lines error/warning lines are
+    kept (the first and the last half) and templates beyond a fixed number of
+    distinct ones are only counted as "untracked".
+    """
+    max_lines = max(2, int(LOG_DIGEST_MAX_LINES))
+    head, tail = [], collections.deque(maxlen=max_lines - max_lines // 2)
+    templates = {}
+    untracked = 0
+    levels = {"error": 0, "warning": 0, "info": 0}
+    first_ts = last_ts = None
+    lines = 0
+    gov = governor()
+    unthrottled = 0
+    with _open_log_text(path) as f:
+        for lines, line in enumerate(f, 1):
+            unthrottled += len(line)
+            if unthrottled >= 1024 * 1024:
+                gov.throttle_read(unthrottled)
+                unthrottled = 0
+            line = line.rstrip("\r\n")
+            m = _TIMESTAMP_RE.match(line)
+            rest = line
+            if m:
+                last_ts = m.group(1)
+                first_ts = first_ts or last_ts
+                rest = line[m.end():]
+            level = _log_line_level(line, rest)
+            levels[level] += 1
+            template = _message_template(rest)
+            entry = templates.get(template)
+            if entry is not None:
+                entry["count"] += 1
+            elif len(templates) < _DIGEST_TRACKED_TEMPLATES:
+                templates[template] = {"count": 1, "level": level, "example": line[:_DIGEST_LINE_CHARS]}
+            else:
+                untracked += 1
+            if level != "info":
+                item = [lines, line[:_DIGEST_LINE_CHARS]]
+                if len(head) < max_lines // 2:
+                    head.append(item)
+                else:
+                    tail.append(item)
+
+    notable = levels["error"] + levels["warning"]
+    top = sorted(templates.items(), key=lambda kv: (-kv[1]["count"], kv[0]))
+    return {
+        "format": LOG_DIGEST_FORMAT,
+        "file": basename(path),
+        "size": os.path.getsize(path),
+        "lines": lines,
+        "first_timestamp": first_ts,
+        "last_timestamp": last_ts,
+        "levels": levels,
+        "notable_lines": head + list(tail),
+        "notable_lines_omitted": max(0, notable - len(head) - len(tail)),
+        "templates": [dict(template=t, **info) for t, info in top[: int(LOG_DIGEST_MAX_TEMPLATES)]],
+        "templates_distinct": len(templates),
+        "templates_untracked_lines": untracked,
+    }
+
+
+def _log_digests_path() -> str:
+    return os.path.join(_root_state_dir(), "log_digests.json")
+
+
+def _upload_log_digests(backend, paths, serialnumber, current_machine_id, root) -> str:
+    """Upload a digest of every log in paths that has none yet; returns report lines.
+
+    Digests are best-effort: their failures do not count as upload failures.
+    """
+    try:
+        with open(_log_digests_path(), "r", encoding="utf-8") as f:
+            sent = json.load(f)
+    except Exception:
+        sent = {}
+    returntxt = ""
+    current = {}
+    paused = False
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        key = f"{st.st_size}:{st.st_mtime}"
+        if sent.get(path) == key:
+            current[path] = key
+            continue
+        paused = paused or (
+            governor().acquisition_active(root) and str(GOVERNOR_ACTIVE_MODE).lower() == "pause"
+        )
+        if paused:
+            continue
+        pre, _ = os.path.splitext(basename(path))
+        remote = _remote_name(f"{serialnumber}_{current_machine_id}_{pre}.digest.json", serialnumber)
+        try:
+            digest = extract_log_digest(path)
+            data = json.dumps(digest, separators=(",", ":")).encode("utf-8")
+            backend.put_bytes(data, remote)
+            current[path] = key
+            returntxt += (
+                f"Digest uploaded: {remote} (errors={digest['levels']['error']}, "
+                f"warnings={digest['levels']['warning']})\n"
+            )
+        except Exception as e:
+            returntxt += f"Digest upload failed: {path} ({type(e).__name__}: {e})\n"
+    # Only files still waiting for upload are remembered
+    try:
+        path = _log_digests_path()
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+    except Exception:
+        pass
+    return returntxt
+
+
+# --- Compression auto-tuning ---
+_PROBE_BYTES = 1024 * 1024
+# Guards compression_tuning.json and the tuners' state
+_compression_tuning_lock = threading.Lock()
+
+
+def _compress_sample(codec: str, data: bytes) -> int:
+    """Compressed size of data with codec (raw stream, as stored in the zip)."""
+    import bz2
+    import lzma
+    import zlib
+
+    compress_type, level = ZIP_CODECS[codec]
+    if compress_type == zipfile.ZIP_STORED:
+        return len(data)
+    if compress_type == zipfile.ZIP_DEFLATED:
+        c = zlib.compressobj(level if level is not None else 6, zlib.DEFLATED, -15)
+        return len(c.compress(data)) + len(c.flush())
+    if compress_type == zipfile.ZIP_BZIP2:
+        return len(bz2.compress(data, level or 9))
+    return len(lzma.compress(data))
+
+
+class CompressionTuner:
+    """Chooses the zip codec that minimises compression plus transfer time.
+
+    Per codec it keeps moving averages of compression speed (input bytes/s)
+    and ratio, and overall the effective upload throughput. Codecs without
+    data, and all codecs every compression_reprobe_files files, are measured
+    on a sample of the next file. State is kept per instrument serial in
+    compression_tuning.json.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self, serialnumber: str):
+        self.serialnumber = serialnumber
+        self.state = {"codecs": {}, "uplink_bps": None, "files": 0}
+        try:
+            with open(self._path(), "r", encoding="utf-8") as f:
+                self.state.update(json.load(f).get(serialnumber, {}))
+        except Exception:
+            pass
+
+    @staticmethod
+    def _path() -> str:
+        return os.path.join(_client_version_state_dir(), "compression_tuning.json")
+
+    def save(self) -> None:
+        try:
+            # One file for all instruments, written by concurrent roots
+            with _compression_tuning_lock:
+                try:
+                    with open(self._path(), "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except Exception:
+                    data = {}
+                data[self.serialnumber] = self.state
+                tmp = _tmp_path(self._path())
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1, sort_keys=True)
+                os.replace(tmp, self._path())
+        except Exception:
+            pass
+
+    def _avg(self, old, new):
+        return new if old is None else (1 - self.ALPHA) * old + self.ALPHA * new
+
+    def _candidates(self) -> list:
+        return [c for c in COMPRESSION_CANDIDATES if c in ZIP_CODECS] or [DEFAULT_ZIP_CODEC]
+
+    def record_compression(self, codec: str, in_bytes: int, out_bytes: int, seconds: float) -> None:
+        if in_bytes <= 0:
+            return
+        with _compression_tuning_lock:
+            st = self.state["codecs"].setdefault(codec, {"speed": None, "ratio": None})
+            st["speed"] = self._avg(st["speed"], in_bytes / max(seconds, 1e-6))
+            st["ratio"] = self._avg(st["ratio"], out_bytes / in_bytes)
+
+    def record_upload(self, out_bytes: int, seconds: float) -> None:
+        if out_bytes > 0 and seconds > 0:
+            with _compression_tuning_lock:
+                self.state["uplink_bps"] = self._avg(self.state["uplink_bps"], out_bytes / seconds)
+
+    def _probe(self, source: str, codecs) -> None:
+        with open(source, "rb") as f:
+            sample = f.read(_PROBE_BYTES)
+        for codec in codecs:
+            t0 = time.perf_counter()
+            out = _compress_sample(codec, sample)
+            self.record_compression(codec, len(sample), out, time.perf_counter() - t0)
+
+    def estimate(self, codec: str, size: int):
+        st = self.state["codecs"].get(codec) or {}
+        uplink = self.state["uplink_bps"]
+        if st.get("speed") is None or not uplink:
+            return None
+        return size / st["speed"] + size * st["ratio"] / uplink
+
+    def choose(self, source: str):
+        """Return (codec, note) for compressing source."""
+        if not COMPRESSION_AUTOTUNE:
+            return DEFAULT_ZIP_CODEC, None
+        candidates = self._candidates()
+        self.state["files"] += 1
+        reprobe = self.state["files"] % max(int(COMPRESSION_REPROBE_FILES), 1) == 0
+        missing = [c for c in candidates if c not in self.state["codecs"]]
+        try:
+            if reprobe or missing:
+                self._probe(source, candidates if reprobe else missing)
+        except OSError:
+            pass
+        size = os.path.getsize(source)
+        estimates = {c: self.estimate(c, size) for c in candidates}
+        known = {c: t for c, t in estimates.items() if t is not None}
+        if not known:
+            return DEFAULT_ZIP_CODEC, "compression: no uplink estimate yet, using default"
+        codec = min(known, key=known.get)
+        uplink_mbit = self.state["uplink_bps"] * 8 / 1e6
+        return codec, (
+            f"compression: {codec} (est. {known[codec]:.2f} s, uplink {uplink_mbit:.2f} Mbit/s, "
+            + ", ".join(f"{c}={t:.2f}s" for c, t in sorted(known.items()))
+            + ")"
+        )
+
+
+_compression_tuners = {}
+_compression_tuners_lock = threading.Lock()
+
+
+def compression_tuner(serialnumber: str) -> CompressionTuner:
+    with _compression_tuners_lock:
+        if serialnumber not in _compression_tuners:
+            _compression_tuners[serialnumber] = CompressionTuner(serialnumber)
+        return _compression_tuners[serialnumber]
+
+
+def _zip_file_tuned(source: str, zipfilename: str, serialnumber: str):
+    """_zip_file with the codec picked by the instrument's CompressionTuner.
+
+    Returns (digest, codec, note).
+    """
+    tuner = compression_tuner(serialnumber)
+    codec, note = tuner.choose(source)
+    timing = {}
+    digest = _zip_file(source, zipfilename, codec, timing)
+    if COMPRESSION_AUTOTUNE:
+        tuner.record_compression(
+            codec, os.path.getsize(source), os.path.getsize(zipfilename), timing["seconds"]
+        )
+    return digest, codec, note
+
+
+def _record_upload_time(serialnumber: str, zipfilename: str, seconds: float) -> None:
+    if COMPRESSION_AUTOTUNE:
+        tuner = compression_tuner(serialnumber)
+        tuner.record_upload(os.path.getsize(zipfilename), seconds)
+        tuner.save()
+
+
+# --- Resource governor: stay out of the way of acquisition ---
+_BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+_PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+# ioprio_set syscall numbers; best-effort class, lowest level
+_IOPRIO_SYSCALLS = {"x86_64": 251, "aarch64": 30, "i686": 289, "i386": 289}
+_IOPRIO_BE_LOWEST = (2 << 13) | 7
+
+
+def lower_process_priority() -> str:
+    """Drop this process to background CPU and I/O priority. Returns a note."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.GetCurrentProcess.argtypes = ()
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        kernel32.SetPriorityClass.argtypes = (wintypes.HANDLE, wintypes.DWORD)
+        kernel32.SetPriorityClass.restype = wintypes.BOOL
+        handle = kernel32.GetCurrentProcess()
+        # Background mode lowers CPU, I/O and memory priority together
+        if kernel32.SetPriorityClass(handle, _PROCESS_MODE_BACKGROUND_BEGIN):
+            return "priority: background mode"
+        if kernel32.SetPriorityClass(handle, _BELOW_NORMAL_PRIORITY_CLASS):
+            return "priority: below normal"
+        return "priority: unchanged"
+    notes = []
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, max(os.getpriority(os.PRIO_PROCESS, 0), 10))
+        notes.append("nice 10")
+    except (AttributeError, OSError):
+        pass
+    nr = _IOPRIO_SYSCALLS.get(platform.machine())
+    if sys.platform.startswith("linux") and nr:
+        try:
+            import ctypes
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.syscall(nr, 1, 0, _IOPRIO_BE_LOWEST) == 0:
+                notes.append("io best-effort 7")
+        except Exception:
+            pass
+    return "priority: " + (", ".join(notes) or "unchanged")
+
+
+class ResourceGovernor:
+    """Keeps compression and uploads from disturbing a running acquisition.
+
+    While the instrument is active (a file in Logs other than our own archives
+    was written within governor_activity_seconds, or governor_activity_file
+    exists), log stages either defer their files ("pause") or run throttled
+    ("slow": one upload connection, capped read rate while zipping and a delay
+    between files). Compressions are
+    limited to governor_compression_threads at a time.
+    """
+
+    _OWN_SUFFIXES = (".zip", ".part", ".tmp")
+
+    def __init__(self):
+        self.enabled = bool(GOVERNOR)
+        self._slots = threading.BoundedSemaphore(max(1, int(GOVERNOR_COMPRESSION_THREADS)))
+        self._lock = threading.Lock()
+        self._active_cache = {}
+
+    @property
+    def slowed(self) -> bool:
+        """Whether the current stage (of the current root) runs throttled; see admit()."""
+        return _governor_slowed.get()
+
+    def compression_slot(self):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._slots
+
+    def _last_activity(self, logs_dir: str) -> float:
+        newest = 0.0
         try:
-            ok = False
+            with os.scandir(logs_dir) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(self._OWN_SUFFIXES) or not entry.is_file():
+                        continue
+                    newest = max(newest, entry.stat().st_mtime)
+        except OSError:
+            pass
+        return newest
+
+    def acquisition_active(self, basepath: str) -> bool:
+        """True while the instrument under basepath looks busy (cached for a few seconds)."""
+        if not self.enabled:
+            return False
+        logs_dir = os.path.join(basepath, "Logs")
+        now = time.time()
+        with self._lock:
+            cached = self._active_cache.get(logs_dir)
+            if cached and now - cached[0] < 5:
+                return cached[1]
+        active = now - self._last_activity(logs_dir) < float(GOVERNOR_ACTIVITY_SECONDS)
+        if GOVERNOR_ACTIVITY_FILE and os.path.exists(GOVERNOR_ACTIVITY_FILE):
+            active = True
+        with self._lock:
+            self._active_cache[logs_dir] = (now, active)
+        return active
+
+    def admit(self, basepath: str) -> bool:
+        """Call before each heavy file; False means defer it to a later cycle."""
+        active = self.acquisition_active(basepath)
+        mode = str(GOVERNOR_ACTIVE_MODE).lower()
+        if active and mode == "pause":
+            _governor_slowed.set(False)
+            return False
+        _governor_slowed.set(active and mode == "slow")
+        if self.slowed and GOVERNOR_SLOW_FILE_DELAY_SECONDS:
+            time.sleep(float(GOVERNOR_SLOW_FILE_DELAY_SECONDS))
+        return True
+
+    def throttle_read(self, nbytes: int) -> float:
+        """Pace reads to governor_slow_read_mbps while slowed; returns the seconds slept."""
+        if self.slowed and GOVERNOR_SLOW_READ_MBPS:
+            delay = nbytes / (float(GOVERNOR_SLOW_READ_MBPS) * 1024 * 1024)
+            time.sleep(delay)
+            return delay
+        return 0.0
+
+
+# Set by admit() for the files that follow; per thread (root), reset by _governed_stage
+_governor_slowed = contextvars.ContextVar("loguploader_governor_slowed", default=False)
+
+
+@contextlib.contextmanager
+def _governed_stage():
+    """Scope of admit() decisions: used as decorator, the slow state ends with the stage."""
+    token = _governor_slowed.set(False)
+    try:
+        yield
+    finally:
+        _governor_slowed.reset(token)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def governor() -> ResourceGovernor:
+    global _governor
+    # Root workers call this concurrently; they must share one compression cap
+    with _governor_lock:
+        if _governor is None:
+            _governor = ResourceGovernor()
+        return _governor
+
+
+def apply_governor_priority() -> str:
+    """Lower the process priority if the governor asks for it; returns a note or ''."""
+    if not (GOVERNOR and GOVERNOR_LOW_PRIORITY):
+        return ""
+    try:
+        return lower_process_priority()
+    except Exception as e:
+        return f"priority: not changed ({type(e).__name__}: {e})"
+
+
+# --- Profiling ---
+def _profiles_dir() -> str:
+    path = os.path.join(_client_version_state_dir(), "profiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class CycleProfiler:
+    """Records a cProfile and tracemalloc snapshots for every stage of one cycle.
+
+    Output goes to profiles/<timestamp>/ in the state folder:
+    <stage>.prof (pstats), <stage>.peak.tracemalloc (snapshot at the highest
+    traced memory sampled during the stage), <stage>.tracemalloc (snapshot at
+    the end of the stage) and summary.json with time and peak traced memory
+    per stage. Only the newest profile_keep_runs runs are kept;
+    tools/profile_summary.py reads them.
+    """
+
+    # Traced memory is sampled this often; a new peak snapshot needs 10 % growth
+    PEAK_SAMPLE_SECONDS = 0.05
+
+    def __init__(self):
+        import tracemalloc
+
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.directory = os.path.join(_profiles_dir(), stamp)
+        os.makedirs(self.directory, exist_ok=True)
+        self._rotate()
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(25)
+        self.summary = {"started": stamp, "stages": {}}
+
+    def _rotate(self) -> None:
+        runs = sorted(
+            d for d in os.listdir(_profiles_dir()) if os.path.isdir(os.path.join(_profiles_dir(), d))
+        )
+        for old in runs[: max(len(runs) - int(PROFILE_KEEP_RUNS), 0)]:
+            shutil.rmtree(os.path.join(_profiles_dir(), old), ignore_errors=True)
+
+    def _sample_peak(self, stop: threading.Event, peak: dict) -> None:
+        """Snapshot the traces whenever traced memory reaches a new high."""
+        import tracemalloc
+
+        while not stop.wait(self.PEAK_SAMPLE_SECONDS):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > peak["bytes"] * 1.1:
+                peak["snapshot"] = tracemalloc.take_snapshot()
+                peak["bytes"] = current
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.reset_peak()
+        peak_sample = {"bytes": tracemalloc.get_traced_memory()[0], "snapshot": None}
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_peak, args=(stop, peak_sample), name="profile-peak", daemon=True
+        )
+        sampler.start()
+        profiler = cProfile.Profile()
+        t0 = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - t0
+            stop.set()
+            sampler.join()
+            current, peak = tracemalloc.get_traced_memory()
+            sampled = peak_sample["snapshot"] is not None and peak_sample["bytes"] > current
             try:
-                ok = bool(nc.drop_file(path))
+                profiler.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+                end = tracemalloc.take_snapshot()
+                end.dump(os.path.join(self.directory, f"{name}.tracemalloc"))
+                # No higher sample: memory peaked at the end of the stage
+                at_peak = peak_sample["snapshot"] if sampled else end
+                at_peak.dump(os.path.join(self.directory, f"{name}.peak.tracemalloc"))
             except Exception:
-                ok = False
+                pass
+            self.summary["stages"][name] = {
+                "seconds": round(seconds, 3),
+                "peak_traced_bytes": peak,
+                "peak_snapshot_bytes": peak_sample["bytes"] if sampled else current,
+                "current_traced_bytes": current,
+            }
+
+    def close(self) -> None:
+        import tracemalloc
+
+        if self._started_tracing:
+            tracemalloc.stop()
+        try:
+            with open(os.path.join(self.directory, "summary.json"), "w", encoding="utf-8") as f:
+                json.dump(self.summary, f, indent=1)
+        except Exception:
+            pass
+
+
+@contextlib.contextmanager
+def _no_profile(name: str):
+    yield
+
+
+# --- Cross-process leases: CLI and service never work on the same files ---
+def _leases_dir() -> str:
+    path = os.path.join(_client_version_state_dir(), "leases")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _pid_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+        kernel32.GetExitCodeProcess.restype = wintypes.BOOL
+        kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        kernel32.CloseHandle.restype = wintypes.BOOL
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            # ERROR_ACCESS_DENIED means the process exists but belongs to someone else
+            return ctypes.get_last_error() == 5
+        try:
+            code = wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class Lease:
+    """Exclusive lease shared between processes, backed by a file in the leases folder.
+
+    While held it is renewed from a background thread every third of its TTL.
+    A lease that expired, or whose owner process on this host is gone, is
+    considered stale and taken over.
+    """
+
+    def __init__(self, name: str, ttl: float = None):
+        self.path = os.path.join(_leases_dir(), name + ".lease")
+        self.ttl = float(ttl or LEASE_TTL_SECONDS)
+        self.token = uuid.uuid4().hex
+        self.held = False
+        # Set when another process took the lease over while we held it
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _record(self) -> bytes:
+        return json.dumps(
+            {
+                "pid": os.getpid(),
+                "host": platform.node(),
+                "token": self.token,
+                "expires": time.time() + self.ttl,
+            }
+        ).encode("utf-8")
+
+    def _read(self, path=None):
+        try:
+            with open(path or self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _is_stale(self, info, path=None) -> bool:
+        if info is None:
+            # Unreadable: either being written right now or corrupt; judge by age
+            try:
+                return time.time() - os.path.getmtime(path or self.path) > self.ttl
+            except OSError:
+                return True
+        if info.get("expires", 0) < time.time():
+            return True
+        if info.get("host") == platform.node() and not _pid_alive(int(info.get("pid", 0))):
+            return True
+        return False
+
+    def _break(self) -> None:
+        """Remove a stale lease, unless it was renewed or replaced in the meantime."""
+        # Move it out of the way first so no other process can renew or take it
+        # between the check and the delete
+        aside = f"{self.path}.{self.token}.stale"
+        try:
+            os.rename(self.path, aside)
+        except OSError:
+            return
+        if not self._is_stale(self._read(aside), aside):
+            # Renewed, or re-acquired by someone else: put it back without
+            # overwriting a lease created since (link fails if the name exists)
+            try:
+                os.link(aside, self.path)
+            except OSError:
+                # Give up; its owner sees the token change and stops
+                pass
+        try:
+            os.remove(aside)
+        except OSError:
+            pass
+
+    def acquire(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                info = self._read()
+                if not self._is_stale(info):
+                    return False
+                self._break()
+                continue
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._record())
+            self.held = True
+            self.lost = False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._heartbeat, name="lease", daemon=True)
+            self._thread.start()
+            return True
+        return False
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            info = self._read()
+            if info is None or info.get("token") != self.token:
+                # Taken over (we were considered dead); stop claiming it
+                self.held = False
+                self.lost = True
+                return
+            try:
+                tmp = f"{self.path}.{self.token}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(self._record())
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.held:
+            info = self._read()
+            if info is not None and info.get("token") == self.token:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+        self.held = False
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+_cycle_lease = contextvars.ContextVar("loguploader_cycle_lease", default=None)
+
+
+@contextlib.contextmanager
+def cycle_lease(basepath: str):
+    """Hold the lease covering a whole upload cycle of the data folder basepath.
+
+    Yields False, without waiting, if another uploader holds it. The stages
+    check cycle_lease_lost() between files.
+    """
+    key = os.path.normcase(os.path.abspath(basepath))
+    lease = Lease("cycle-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20])
+    if not lease.acquire():
+        yield False
+        return
+    token = _cycle_lease.set(lease)
+    try:
+        yield True
+    finally:
+        _cycle_lease.reset(token)
+        lease.release()
+
+
+def cycle_lease_lost() -> bool:
+    """True if the cycle lease held by this thread was taken over by another uploader."""
+    lease = _cycle_lease.get()
+    return lease is not None and lease.lost
+
+
+# --- Settings XML diffs ---
+SETTINGS_DIFF_FORMAT = "loguploader-xml-diff/1"
+
+
+def _settings_diff_ops(base: bytes, new: bytes) -> list:
+    """Line-based edit script turning base into new: [[i1, i2, [lines...]], ...].
+
+    Lines are kept as latin-1 text so every byte round-trips unchanged.
+    """
+    import difflib
+
+    a = base.decode("latin-1").splitlines(keepends=True)
+    b = new.decode("latin-1").splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag != "equal":
+            ops.append([i1, i2, b[j1:j2]])
+    return ops
+
+
+def apply_settings_diff(base: bytes, diff: dict) -> bytes:
+    """Rebuild a settings file from its previous version and a diff document."""
+    if diff.get("format") != SETTINGS_DIFF_FORMAT:
+        raise ValueError(f"Unsupported diff format {diff.get('format')!r}")
+    if diff.get("base_sha256") and hashlib.sha256(base).hexdigest() != diff["base_sha256"]:
+        raise ValueError("Base does not match the diff's base_sha256")
+    a = base.decode("latin-1").splitlines(keepends=True)
+    out = []
+    pos = 0
+    for i1, i2, lines in diff["ops"]:
+        out.extend(a[pos:i1])
+        out.extend(lines)
+        pos = i2
+    out.extend(a[pos:])
+    return "".join(out).encode("latin-1")
+
+
+def _settings_baseline_paths(scope: str, name: str):
+    folder = os.path.join(_root_state_dir(), "settings_baselines", scope)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, name), os.path.join(folder, name + ".state.json")
+
+
+def _prepare_settings_archive(source: str, scope: str, zip_stem: str):
+    """Zip a changed settings file for upload.
+
+    In diff mode the archive holds "<name>.diff.json" (edit script against the
+    last uploaded version, see apply_settings_diff) or, for full snapshots,
+    the file plus "<name>.meta.json". Both carry the content SHA-256, the
+    sequence number since the last snapshot and the remote names of the
+    snapshot and of the parent archive, so the history can be rebuilt.
+
+    Returns (zipfilename, on_uploaded); call on_uploaded() once the archive was
+    uploaded so it becomes the new baseline.
+    """
+    if not SETTINGS_DIFF_UPLOAD:
+        zipfilename = zip_stem + ".zip"
+        _zip_file(source, zipfilename)
+        return zipfilename, lambda: None
+
+    name = basename(source)
+    with open(source, "rb") as f:
+        data = f.read()
+    sha = hashlib.sha256(data).hexdigest()
+    baseline_path, state_path = _settings_baseline_paths(scope, name)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        with open(baseline_path, "rb") as f:
+            base = f.read()
+        if hashlib.sha256(base).hexdigest() != state.get("sha256"):
+            state, base = {}, None
+    except Exception:
+        state, base = {}, None
+
+    diff = None
+    sequence = int(state.get("sequence", 0)) + 1
+    if base is not None and sequence < int(SETTINGS_FULL_SNAPSHOT_EVERY):
+        doc = {
+            "format": SETTINGS_DIFF_FORMAT,
+            "type": "diff",
+            "file": name,
+            "scope": scope,
+            "sequence": sequence,
+            "snapshot": state.get("snapshot"),
+            "parent": state.get("parent"),
+            "base_sha256": state.get("sha256"),
+            "sha256": sha,
+            "ops": _settings_diff_ops(base, data),
+        }
+        encoded = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+        if len(encoded) < len(data):
+            diff = encoded
+
+    if diff is not None:
+        zipfilename = zip_stem + ".diff.zip"
+        with zipfile.ZipFile(zipfilename, "w") as zipObj:
+            zipObj.writestr(name + ".diff.json", diff, compress_type=zipfile.ZIP_DEFLATED)
+        remote = basename(zipfilename)
+        new_state = {
+            "sequence": sequence,
+            "snapshot": state.get("snapshot"),
+            "parent": remote,
+            "sha256": sha,
+        }
+    else:
+        zipfilename = zip_stem + ".zip"
+        remote = basename(zipfilename)
+        meta = {
+            "format": SETTINGS_DIFF_FORMAT,
+            "type": "full",
+            "file": name,
+            "scope": scope,
+            "sequence": 0,
+            "snapshot": remote,
+            "parent": state.get("parent"),
+            "sha256": sha,
+        }
+        with zipfile.ZipFile(zipfilename, "w") as zipObj:
+            zipObj.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+            zipObj.writestr(name + ".meta.json", json.dumps(meta, indent=1), compress_type=zipfile.ZIP_DEFLATED)
+        new_state = {"sequence": 0, "snapshot": remote, "parent": remote, "sha256": sha}
+
+    def on_uploaded():
+        try:
+            with open(baseline_path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(baseline_path + ".tmp", baseline_path)
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump(new_state, f, indent=1)
+        except Exception:
+            # A missing baseline only means the next change is sent in full
+            pass
+
+    return zipfilename, on_uploaded
+
+
+# --- Remote layout ---
+def _remote_name(local_path: str, serialnumber: str, when=None) -> str:
+    """Remote path of an upload according to remote_layout."""
+    name = basename(local_path)
+    if str(REMOTE_LAYOUT).lower() != "partitioned":
+        return name
+    when = when or datetime.datetime.now()
+    return f"{serialnumber}/{when:%Y}/{when:%m}/{name}"
+
+
+_remote_collections = None
+_remote_collections_lock = threading.Lock()
+
 
-            if not ok:
-                _public_dav_put_file(path, os.path.basename(path))
-                return True, attempts, "pyncclient failed; uploaded via public.php/dav"
+def _remote_collections_path() -> str:
+    return os.path.join(_client_version_state_dir(), "remote_collections.json")
 
-            return True, attempts, None
+
+def _known_collections() -> set:
+    global _remote_collections
+    if _remote_collections is None:
+        try:
+            with open(_remote_collections_path(), "r", encoding="utf-8") as f:
+                _remote_collections = set(json.load(f))
+        except Exception:
+            _remote_collections = set()
+    return _remote_collections
+
+
+def _save_known_collections() -> None:
+    try:
+        path = _remote_collections_path()
+        tmp = _tmp_path(path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(_remote_collections), f, indent=1)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _public_dav_ensure_collection(remote_dir: str) -> None:
+    """MKCOL remote_dir and its parents once; created collections are cached locally."""
+    if not remote_dir:
+        return
+    base_url, token = _public_dav_url("")
+    parts = remote_dir.strip("/").split("/")
+    with _remote_collections_lock:
+        known = _known_collections()
+        changed = False
+        for i in range(1, len(parts) + 1):
+            key = base_url + "/".join(parts[:i])
+            if key in known:
+                continue
+            r = requests.request(
+                "MKCOL",
+                key,
+                auth=(token, ""),
+                headers={"X-Requested-With": "XMLHttpRequest"},
+                timeout=60,
+            )
+            # 405: the collection exists already
+            if r.status_code not in (201, 405):
+                if changed:
+                    _save_known_collections()
+                raise RuntimeError(f"MKCOL {'/'.join(parts[:i])} failed: HTTP {r.status_code}")
+            known.add(key)
+            changed = True
+        if changed:
+            _save_known_collections()
+
+
+def _public_dav_forget_collection(remote_dir: str) -> None:
+    """Drop remote_dir (and its parents) from the cache, e.g. after a 409 on PUT."""
+    base_url, _ = _public_dav_url("")
+    parts = remote_dir.strip("/").split("/")
+    with _remote_collections_lock:
+        known = _known_collections()
+        for i in range(1, len(parts) + 1):
+            known.discard(base_url + "/".join(parts[:i]))
+        _save_known_collections()
+
+
+# --- Upload backends: where the stages send their archives ---
+class UploadBackend(abc.ABC):
+    """Destination for uploaded files. All upload stages go through this interface."""
+
+    name = "base"
+
+    def connect(self) -> bool:
+        """Prepare the backend for a stage; False reports "Connection failed"."""
+        return True
+
+    @abc.abstractmethod
+    def upload(self, path: str, remote_name: str = None, sha256: str = ""):
+        """Store the file at path as remote_name. Returns (ok, attempts, note_or_error)."""
+
+    @abc.abstractmethod
+    def put_bytes(self, data: bytes, remote_name: str) -> None:
+        """Store data as remote_name; raises on failure."""
+
+    def remote_info(self, remote_name: str):
+        """Return (size, checksums) of remote_name; size is None if unknown."""
+        return None, []
+
+
+class NextcloudBackend(UploadBackend):
+    """Nextcloud public file-drop share (pyncclient / public.php/dav)."""
+
+    name = "nextcloud"
+
+    def __init__(self):
+        self.nc = None
+
+    def connect(self) -> bool:
+        self.nc = nextcloud_client.Client.from_public_link(_get_public_link())
+        return bool(self.nc)
+
+    def upload(self, path, remote_name=None, sha256=""):
+        remote_name = remote_name or os.path.basename(path)
+        remote_dir = posixpath.dirname(remote_name)
+        if remote_dir:
+            try:
+                _public_dav_ensure_collection(remote_dir)
+            except Exception as e:
+                return False, 1, f"{type(e).__name__}: {e}"
+        result = _drop_with_retries(self.nc, path, sha256, remote_name)
+        if not result[0] and remote_dir:
+            # The cached collection may have been removed on the server
+            _public_dav_forget_collection(remote_dir)
+        return result
+
+    def put_bytes(self, data, remote_name):
+        _public_dav_ensure_collection(posixpath.dirname(remote_name))
+        url, token = _public_dav_url(remote_name)
+        r = requests.put(
+            url,
+            data=data,
+            auth=(token, ""),
+            headers={"X-Requested-With": "XMLHttpRequest"},
+            timeout=60,
+        )
+        if r.status_code not in (200, 201, 204):
+            raise RuntimeError(f"public DAV upload failed: HTTP {r.status_code} {r.text}")
+
+    def remote_info(self, remote_name):
+        return _remote_file_info(remote_name)
+
+
+class LocalDirectoryBackend(UploadBackend):
+    """Copy files into a local or mounted directory (on-site collector share)."""
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def connect(self) -> bool:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            return True
+        except OSError:
+            return False
+
+    def _target(self, remote_name: str) -> str:
+        return os.path.join(self.directory, *remote_name.split("/"))
+
+    def upload(self, path, remote_name=None, sha256=""):
+        target = self._target(remote_name or os.path.basename(path))
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Copy under a temporary name so collectors never see partial files
+            tmp = target + ".part"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+            return True, 1, None
         except Exception as e:
-            last_error = f"{type(e).__name__}: {e}"
-        if attempts < MAX_UPLOAD_ATTEMPTS:
-            time.sleep(UPLOAD_BACKOFF_SECONDS)
-    return False, attempts, last_error
+            return False, 1, f"{type(e).__name__}: {e}"
+
+    def put_bytes(self, data, remote_name):
+        target = self._target(remote_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = target + ".part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+
+    def remote_info(self, remote_name):
+        try:
+            size = os.path.getsize(self._target(remote_name))
+        except OSError:
+            return None, []
+        return size, []
+
+
+class MemoryBackend(UploadBackend):
+    """Keep uploads in a dict; for offline tests and benchmarks of the pipeline."""
+
+    name = "memory"
+
+    def __init__(self):
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def upload(self, path, remote_name=None, sha256=""):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.put_bytes(data, remote_name or os.path.basename(path))
+        return True, 1, None
+
+    def put_bytes(self, data, remote_name):
+        with self._lock:
+            self.files[remote_name] = bytes(data)
+
+    def remote_info(self, remote_name):
+        with self._lock:
+            data = self.files.get(remote_name)
+        if data is None:
+            return None, []
+        return len(data), ["SHA256:" + hashlib.sha256(data).hexdigest()]
+
+
+class SharedBudgetBackend(UploadBackend):
+    """Wraps a backend so all data roots share its connections and bandwidth.
+
+    At most `connections` uploads run at once and uploads are paced so the
+    average rate stays below kbps: every upload books its size on a shared
+    timeline and waits until its slot starts.
+    """
+
+    def __init__(self, inner: UploadBackend, connections: int = 4, kbps: float = 0):
+        self.inner = inner
+        self.name = inner.name
+        self.kbps = float(kbps or 0)
+        self._slots = threading.BoundedSemaphore(max(1, int(connections)))
+        self._pace_lock = threading.Lock()
+        self._next_start = 0.0
+
+    def _pace(self, nbytes: int) -> None:
+        if self.kbps <= 0:
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + nbytes * 8 / (self.kbps * 1000)
+        if start > now:
+            time.sleep(start - now)
+
+    def connect(self) -> bool:
+        return self.inner.connect()
+
+    def upload(self, path, remote_name=None, sha256=""):
+        with self._slots:
+            try:
+                self._pace(os.path.getsize(path))
+            except OSError:
+                pass
+            return self.inner.upload(path, remote_name, sha256)
+
+    def put_bytes(self, data, remote_name):
+        with self._slots:
+            self._pace(len(data))
+            self.inner.put_bytes(data, remote_name)
+
+    def remote_info(self, remote_name):
+        return self.inner.remote_info(remote_name)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> UploadBackend:
+    """Return the configured upload backend (created once per process)."""
+    global _backend
+    # Root workers call this concurrently; they must share one upload budget
+    with _backend_lock:
+        if _backend is None:
+            kind = str(UPLOAD_BACKEND).lower()
+            if kind == "local":
+                if not LOCAL_BACKEND_DIR:
+                    raise RuntimeError("upload_backend = 'local' requires local_backend_dir in settings.py")
+                backend = LocalDirectoryBackend(LOCAL_BACKEND_DIR)
+            elif kind == "memory":
+                backend = MemoryBackend()
+            elif kind == "nextcloud":
+                backend = NextcloudBackend()
+            else:
+                raise RuntimeError(f"Unknown upload_backend '{UPLOAD_BACKEND}'")
+            if DATA_ROOTS or BANDWIDTH_LIMIT_KBPS:
+                backend = SharedBudgetBackend(backend, SHARED_UPLOAD_CONNECTIONS, BANDWIDTH_LIMIT_KBPS)
+            _backend = backend
+        return _backend
+
+
+def set_backend(backend: UploadBackend) -> None:
+    """Replace the upload backend, e.g. with a MemoryBackend in benchmarks."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
 
 
 def getLumiSerial(basepath):
@@ -294,6 +2303,7 @@ def getLumiSerial(basepath):
         return "0000000"
 
 
+@_governed_stage()
 def uploadlog(
     basepath="",
     serialnumber="0000000",
@@ -301,30 +2311,48 @@ def uploadlog(
 ):
     if not os.path.isdir(basepath):
         basepath = os.path.dirname(os.path.realpath(__file__))
+    root = basepath
     basepath = os.path.join(basepath, "Logs")
 
     returntxt = f"LogDir: {basepath}\n"
-    nc = nextcloud_client.Client.from_public_link(_get_public_link())
-    if nc:
+    backend = get_backend()
+    if backend.connect():
         filepattern = os.path.join(basepath, "*.pqlog")
         logfiles = glob.glob(filepattern)
         logfiles.sort()
-        for logfilename in logfiles:
-            # try to see if the file is open
-            try:
-                os.rename(logfilename, logfilename)
-            except OSError:
-                returntxt = returntxt + f"File is open, skipping: {logfilename}\n"
-                continue
+        logfiles, waiting = _quiescent_files(logfiles, "logs")
+        for logfilename in waiting:
+            returntxt = returntxt + f"File still changing, waiting: {logfilename}\n"
+        if LOG_DIGEST:
+            # Digests of all ready logs go out before any full archive
+            returntxt += _upload_log_digests(backend, logfiles, serialnumber, current_machine_id, root)
+        shipped = 0
+        for i, logfilename in enumerate(logfiles):
+            if cycle_lease_lost():
+                returntxt += f"Cycle lease lost to another uploader, leaving {len(logfiles) - i} files to it\n"
+                break
+            if ROOT_FILES_PER_CYCLE and shipped >= int(ROOT_FILES_PER_CYCLE):
+                returntxt += f"Per-cycle quota reached, {len(logfiles) - i} files left for next cycle\n"
+                break
+            if not governor().admit(root):
+                returntxt += f"Acquisition active, deferring {len(logfiles) - i} files\n"
+                break
             pre, ext = os.path.splitext(os.path.basename(logfilename))
             zipfilename = os.path.join(
                 basepath, f"{serialnumber}_{current_machine_id}_{pre}.zip"
             )
-            zipObj = zipfile.ZipFile(zipfilename, "w")
-            zipObj.write(
-                logfilename, basename(logfilename), compress_type=zipfile.ZIP_DEFLATED
-            )
-            zipObj.close()
+            remote_name = _remote_name(zipfilename, serialnumber)
+            if ledger_has_upload(remote_name, logfilename):
+                # Uploaded before, but the source survived (crash/reboot before delete)
+                returntxt += f"Already uploaded, removing source: {logfilename}\n"
+                try:
+                    os.remove(logfilename)
+                except Exception:
+                    pass
+                continue
+            digest, codec, codec_note = _zip_file_tuned(logfilename, zipfilename, serialnumber)
+            if codec_note:
+                returntxt += f"{codec_note}: {logfilename}\n"
 
             too_big, size_mb = _too_large(zipfilename)
             if too_big:
@@ -337,12 +2365,38 @@ def uploadlog(
                     pass
                 continue
 
-            ok, attempts, last_error = _drop_with_retries(nc, zipfilename)
-            if ok:
+            zip_sha256 = _file_sha256(zipfilename) if VERIFY_UPLOADS else ""
+            t0 = time.perf_counter()
+            ok, attempts, last_error = backend.upload(zipfilename, remote_name, zip_sha256)
+            elapsed = time.perf_counter() - t0
+            shipped += 1
+            if ok and attempts == 1:
+                _record_upload_time(serialnumber, zipfilename, elapsed)
+            verified, verify_note = True, None
+            if ok and VERIFY_UPLOADS:
+                verified, verify_note = _verify_remote_upload(
+                    backend, zipfilename, remote_name, zip_sha256
+                )
+            daily_stats_record_upload(
+                os.path.getsize(logfilename), os.path.getsize(zipfilename), elapsed, ok and verified
+            )
+            if ok and not verified:
+                returntxt = (
+                    returntxt
+                    + f"Upload Failed verification, keeping source: {zipfilename} ({verify_note})\n"
+                )
+                try:
+                    os.remove(zipfilename)
+                except Exception:
+                    pass
+            elif ok:
                 if last_error:
                     returntxt = returntxt + f"Uploaded: {zipfilename} (attempts={attempts}, note={last_error})\n"
                 else:
                     returntxt = returntxt + f"Uploaded: {zipfilename} (attempts={attempts})\n"
+                ledger_record_upload(
+                    remote_name, digest, os.path.getsize(zipfilename), VERIFY_UPLOADS
+                )
                 try:
                     os.remove(logfilename)
                 except Exception:
@@ -368,6 +2422,7 @@ def uploadlog(
     return returntxt
 
 
+@_governed_stage()
 def uploadLaserPowerLog(
     basepath="",
     serialnumber="0000000",
@@ -378,19 +2433,25 @@ def uploadLaserPowerLog(
         basepath = os.path.dirname(os.path.realpath(__file__))
 
     returntxt = f"LaserPower.log Dir: {basepath}\n"
-    nc = nextcloud_client.Client.from_public_link(_get_public_link())
-    if nc:
+    backend = get_backend()
+    if backend.connect():
         filepattern = os.path.join(basepath, "LaserPower.log")
         logfiles = glob.glob(filepattern)
         logfiles.sort()
-        for logfilename in logfiles:
-            # try to see if the file is open
-            try:
-                os.rename(logfilename, logfilename)
-            except OSError:
-                returntxt = returntxt + f"File is open, skipping: {logfilename}\n"
-                continue
-
+        logfiles, waiting = _quiescent_files(logfiles, "laserpower")
+        for logfilename in waiting:
+            returntxt = returntxt + f"File still changing, waiting: {logfilename}\n"
+        shipped = 0
+        for i, logfilename in enumerate(logfiles):
+            if cycle_lease_lost():
+                returntxt += f"Cycle lease lost to another uploader, leaving {len(logfiles) - i} files to it\n"
+                break
+            if ROOT_FILES_PER_CYCLE and shipped >= int(ROOT_FILES_PER_CYCLE):
+                returntxt += f"Per-cycle quota reached, {len(logfiles) - i} files left for next cycle\n"
+                break
+            if not governor().admit(basepath):
+                returntxt += f"Acquisition active, deferring {len(logfiles) - i} files\n"
+                break
             # Get the file modification time (Unix timestamp)
             mod_time = os.path.getmtime(logfilename)
 
@@ -403,11 +2464,18 @@ def uploadLaserPowerLog(
                 basepath,
                 f"{serialnumber}_{current_machine_id}_{pre}_{mod_time_str}.zip",
             )
-            zipObj = zipfile.ZipFile(zipfilename, "w")
-            zipObj.write(
-                logfilename, basename(logfilename), compress_type=zipfile.ZIP_DEFLATED
-            )
-            zipObj.close()
+            remote_name = _remote_name(zipfilename, serialnumber)
+            if ledger_has_upload(remote_name, logfilename):
+                # Uploaded before, but the source survived (crash/reboot before delete)
+                returntxt += f"Already uploaded, removing source: {logfilename}\n"
+                try:
+                    os.remove(logfilename)
+                except Exception:
+                    pass
+                continue
+            digest, codec, codec_note = _zip_file_tuned(logfilename, zipfilename, serialnumber)
+            if codec_note:
+                returntxt += f"{codec_note}: {logfilename}\n"
 
             too_big, size_mb = _too_large(zipfilename)
             if too_big:
@@ -420,12 +2488,38 @@ def uploadLaserPowerLog(
                     pass
                 continue
 
-            ok, attempts, last_error = _drop_with_retries(nc, zipfilename)
-            if ok:
+            zip_sha256 = _file_sha256(zipfilename) if VERIFY_UPLOADS else ""
+            t0 = time.perf_counter()
+            ok, attempts, last_error = backend.upload(zipfilename, remote_name, zip_sha256)
+            elapsed = time.perf_counter() - t0
+            shipped += 1
+            if ok and attempts == 1:
+                _record_upload_time(serialnumber, zipfilename, elapsed)
+            verified, verify_note = True, None
+            if ok and VERIFY_UPLOADS:
+                verified, verify_note = _verify_remote_upload(
+                    backend, zipfilename, remote_name, zip_sha256
+                )
+            daily_stats_record_upload(
+                os.path.getsize(logfilename), os.path.getsize(zipfilename), elapsed, ok and verified
+            )
+            if ok and not verified:
+                returntxt = (
+                    returntxt
+                    + f"Upload Failed verification, keeping source: {zipfilename} ({verify_note})\n"
+                )
+                try:
+                    os.remove(zipfilename)
+                except Exception:
+                    pass
+            elif ok:
                 if last_error:
                     returntxt = returntxt + f"Uploaded: {zipfilename} (attempts={attempts}, note={last_error})\n"
                 else:
                     returntxt = returntxt + f"Uploaded: {zipfilename} (attempts={attempts})\n"
+                ledger_record_upload(
+                    remote_name, digest, os.path.getsize(zipfilename), VERIFY_UPLOADS
+                )
                 try:
                     os.remove(logfilename)
                 except Exception:
@@ -463,26 +2557,26 @@ def uploadSettings(
     basepath = os.path.join(basepath, "")
     returntxt = f"SettingsDir: {basepath}\n"
 
-    nc = nextcloud_client.Client.from_public_link(_get_public_link())
-    if nc:
+    backend = get_backend()
+    if backend.connect():
         filepattern = os.path.join(basepath, "*.xml")
         settingsFiles = glob.glob(filepattern)
         settingsFiles.sort()
         for settingsFileName in settingsFiles:
+            if cycle_lease_lost():
+                returntxt += "Cycle lease lost to another uploader, leaving the remaining files to it\n"
+                break
             if has_file_changed(settingsFileName):
                 pre, ext = os.path.splitext(os.path.basename(settingsFileName))
                 timestamp = dt.datetime.now().strftime("%Y%m%d%H%M%S")
-                zipfilename = os.path.join(
-                    basepath,
-                    f"{serialnumber}_{current_machine_id}_{pre}_{timestamp}.zip",
-                )
-                zipObj = zipfile.ZipFile(zipfilename, "w")
-                zipObj.write(
+                zipfilename, on_uploaded = _prepare_settings_archive(
                     settingsFileName,
-                    basename(settingsFileName),
-                    compress_type=zipfile.ZIP_DEFLATED,
+                    "root",
+                    os.path.join(
+                        basepath,
+                        f"{serialnumber}_{current_machine_id}_{pre}_{timestamp}",
+                    ),
                 )
-                zipObj.close()
 
                 too_big, size_mb = _too_large(zipfilename)
                 if too_big:
@@ -495,8 +2589,18 @@ def uploadSettings(
                         pass
                     continue
 
-                ok, attempts, last_error = _drop_with_retries(nc, zipfilename)
+                t0 = time.perf_counter()
+                ok, attempts, last_error = backend.upload(
+                    zipfilename, _remote_name(zipfilename, serialnumber)
+                )
+                daily_stats_record_upload(
+                    os.path.getsize(settingsFileName),
+                    os.path.getsize(zipfilename),
+                    time.perf_counter() - t0,
+                    ok,
+                )
                 if ok:
+                    on_uploaded()
                     if last_error:
                         returntxt = returntxt + f"Uploaded: {zipfilename} (attempts={attempts}, note={last_error})\n"
                     else:
@@ -530,26 +2634,26 @@ def uploadUserSettings(
     basepath = os.path.join(basepath, "UserSettings")
 
     returntxt = f"UserSettingsDir: {basepath}\n"
-    nc = nextcloud_client.Client.from_public_link(_get_public_link())
-    if nc:
+    backend = get_backend()
+    if backend.connect():
         filepattern = os.path.join(basepath, "*.xml")
         settingsFiles = glob.glob(filepattern)
         settingsFiles.sort()
         for settingsFileName in settingsFiles:
+            if cycle_lease_lost():
+                returntxt += "Cycle lease lost to another uploader, leaving the remaining files to it\n"
+                break
             if has_file_changed(settingsFileName):
                 pre, ext = os.path.splitext(os.path.basename(settingsFileName))
                 timestamp = dt.datetime.now().strftime("%Y%m%d%H%M%S")
-                zipfilename = os.path.join(
-                    basepath,
-                    f"{serialnumber}_{current_machine_id}_UserSettings_{pre}_{timestamp}.zip",
-                )
-                zipObj = zipfile.ZipFile(zipfilename, "w")
-                zipObj.write(
+                zipfilename, on_uploaded = _prepare_settings_archive(
                     settingsFileName,
-                    basename(settingsFileName),
-                    compress_type=zipfile.ZIP_DEFLATED,
+                    "UserSettings",
+                    os.path.join(
+                        basepath,
+                        f"{serialnumber}_{current_machine_id}_UserSettings_{pre}_{timestamp}",
+                    ),
                 )
-                zipObj.close()
 
                 too_big, size_mb = _too_large(zipfilename)
                 if too_big:
@@ -562,8 +2666,18 @@ def uploadUserSettings(
                         pass
                     continue
 
-                ok, attempts, last_error = _drop_with_retries(nc, zipfilename)
+                t0 = time.perf_counter()
+                ok, attempts, last_error = backend.upload(
+                    zipfilename, _remote_name(zipfilename, serialnumber)
+                )
+                daily_stats_record_upload(
+                    os.path.getsize(settingsFileName),
+                    os.path.getsize(zipfilename),
+                    time.perf_counter() - t0,
+                    ok,
+                )
                 if ok:
+                    on_uploaded()
                     if last_error:
                         returntxt = returntxt + f"Uploaded: {zipfilename} (attempts={attempts}, note={last_error})\n"
                     else:
@@ -597,17 +2711,15 @@ def copyDB(
 
     returntxt = f"DBDir: {basepath}\n"
 
-    source_file = os.path.join(sourcepath, "PQDevice.db")
-    destination_file = os.path.join(basepath, "PQDevice.db.xml")
-
-    shutil.copy2(source_file, destination_file)
-    returntxt += f"File copied from {source_file} to {destination_file}\n"
-
-    source_file = os.path.join(sourcepath, "PQDevice.conf")
-    destination_file = os.path.join(basepath, "PQDevice.conf.xml")
-
-    shutil.copy2(source_file, destination_file)
-    returntxt += f"File copied from {source_file} to {destination_file}\n"
+    for name in ("PQDevice.db", "PQDevice.conf"):
+        source_file = os.path.join(sourcepath, name)
+        destination_file = os.path.join(basepath, f"{name}.xml")
+        if not os.path.isfile(source_file) and sys.platform != "win32":
+            # No Luminosa installation on analysis workstations; upload the rest
+            returntxt += f"Not found, skipped: {source_file}\n"
+            continue
+        shutil.copy2(source_file, destination_file)
+        returntxt += f"File copied from {source_file} to {destination_file}\n"
 
     return returntxt
 
@@ -651,6 +2763,41 @@ def get_machine_guid_linux():
         return "00000000-0000-0000-0000-000000000000"  # Fallback UUID
 
 
+def _root_key(path: str) -> str:
+    """Stable folder-safe id of a data root: its folder name plus a path hash."""
+    full = os.path.normcase(os.path.abspath(path))
+    label = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.basename(full.rstrip("\\/")) or "root")
+    return f"{label[:40]}-{hashlib.sha1(full.encode('utf-8')).hexdigest()[:8]}"
+
+
+def data_roots(default_machine_id: str, local_dir: str = "") -> list:
+    """Resolve settings.data_roots into [{"path", "serial", "machine_id", "key", "local"}, ...].
+
+    "local" marks the root of the Luminosa installation on this PC (by default
+    the one at local_dir, the platform data folder); only it gets PQDevice copies.
+    """
+    local_path = os.path.normcase(os.path.abspath(local_dir)) if local_dir else None
+    entries = DATA_ROOTS or []
+    if isinstance(entries, str):
+        # DATA_ROOTS environment variable: paths separated by os.pathsep
+        entries = [p for p in entries.split(os.pathsep) if p.strip()]
+    roots = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        path = os.path.abspath(entry["path"])
+        roots.append(
+            {
+                "path": path,
+                "serial": entry.get("serial") or getLumiSerial(path),
+                "machine_id": entry.get("machine_id") or default_machine_id,
+                "key": entry.get("key") or _root_key(path),
+                "local": bool(entry.get("local", os.path.normcase(path) == local_path)),
+            }
+        )
+    return roots
+
+
 def init():
     """Initialize platform-specific configurations and retrieve machine ID."""
     if sys.platform == "win32":  # Windows-specific logic
@@ -681,6 +2828,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "dir", help="Log Directory", type=str, nargs="?", default=defaultDir
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=bool(PROFILE),
+        help="Record cProfile/tracemalloc data per stage (see tools/profile_summary.py)",
+    )
     args = parser.parse_args()
 
     if os.path.isdir(os.path.abspath(args.dir)):
@@ -695,8 +2848,49 @@ if __name__ == "__main__":
 
         print(f"Luminosa Serial Number: {serialnumber}")
 
-    print(copyDB(basepath))
-    print(uploadSettings(basepath, serialnumber, current_machine_id))
-    print(uploadUserSettings(basepath, serialnumber, current_machine_id))
-    print(uploadLaserPowerLog(basepath, serialnumber, current_machine_id))
-    print(uploadlog(basepath, serialnumber, current_machine_id))
+    with cycle_lease(basepath) as held:
+        if not held:
+            # The service (or another CLI run) is in the middle of a cycle
+            print("Another uploader is running; nothing to do.")
+            sys.exit(0)
+        note = apply_governor_priority()
+        if note:
+            print(note)
+        import uploadlogging
+
+        # Same report text on the console, plus rotating JSON log files of
+        # its own (the running service holds loguploader.log open)
+        pipeline = uploadlogging.start_logging(
+            log_dir=LOG_DIR or os.path.join(_client_version_state_dir(), "logs"),
+            max_bytes=LOG_MAX_BYTES,
+            backup_count=LOG_BACKUP_COUNT,
+            console=True,
+            queue_size=LOG_QUEUE_SIZE,
+            filename="loguploader-cli.log",
+        )
+        log = uploadlogging.LoggingSink()
+        profiler = CycleProfiler() if args.profile else None
+        stage = profiler.stage if profiler else _no_profile
+        try:
+            with stage("copyDB"):
+                log.info(copyDB(basepath), stage="copyDB")
+            report = ""
+            for name, fn in (
+                ("uploadSettings", uploadSettings),
+                ("uploadUserSettings", uploadUserSettings),
+                ("uploadLaserPowerLog", uploadLaserPowerLog),
+                ("uploadlog", uploadlog),
+            ):
+                with stage(name):
+                    rtn = fn(basepath, serialnumber, current_machine_id)
+                log.info(rtn, stage=name)
+                report += rtn
+            backlog, backlog_bytes = backlog_stats(basepath)
+            daily_stats_record_cycle(
+                did_any_upload_succeed(report), did_any_upload_fail(report), backlog, backlog_bytes
+            )
+        finally:
+            if profiler:
+                profiler.close()
+                log.info(f"Profile written to {profiler.directory}")
+            pipeline.stop()
@@ -1,91 +1,33 @@
-import time
 import win32serviceutil  # ServiceFramework and commandline helper
 import win32service  # Events
 import servicemanager  # Simple setup and logging
-import loguploader
+import uploaddaemon
+import uploadlogging
 import sys
 import win32timezone
-try:
-    import settings  # type: ignore
-except Exception:
-    from types import SimpleNamespace
-
-    settings = SimpleNamespace()
 import pywintypes
 
 
-class LumiLogUploadService:
-    """Luminosa Log Upload Service"""
-
-    def stop(self):
-        """Stop the service"""
-        self.running = False
-
-    def run(self):
-        """Main service loop. This is where work is done!"""
-        self.running = True
-        interval = getattr(settings, "service_interval_seconds", 300)
-        while self.running:
-            try:
-                servicemanager.LogInfoMsg("Service running...")
-                [defaultDir, serialnumber, currentMachineID] = loguploader.init()
-                servicemanager.LogInfoMsg(f"Log Directory: {defaultDir}")
-                servicemanager.LogInfoMsg(f"System Serial Number: {serialnumber}")
-                servicemanager.LogInfoMsg(f"ID: {currentMachineID}")
-
-                rtn = loguploader.copyDB(basepath=defaultDir)
-                servicemanager.LogInfoMsg(rtn)
-
-                rtn = loguploader.uploadSettings(
-                    basepath=defaultDir,
-                    serialnumber=serialnumber,
-                    current_machine_id=currentMachineID,
-                )
-                servicemanager.LogInfoMsg(rtn)
-                any_uploaded = loguploader.did_any_upload_succeed(rtn)
-
-                rtn = loguploader.uploadUserSettings(
-                    basepath=defaultDir,
-                    serialnumber=serialnumber,
-                    current_machine_id=currentMachineID,
-                )
-                servicemanager.LogInfoMsg(rtn)
-                any_uploaded = any_uploaded or loguploader.did_any_upload_succeed(rtn)
+def _write_event_log(level, text):
+    if level == "error":
+        servicemanager.LogErrorMsg(text)
+    else:
+        servicemanager.LogInfoMsg(text)
 
-                rtn = loguploader.uploadLaserPowerLog(
-                    basepath=defaultDir,
-                    serialnumber=serialnumber,
-                    current_machine_id=currentMachineID,
-                )
-                servicemanager.LogInfoMsg(rtn)
-                any_uploaded = any_uploaded or loguploader.did_any_upload_succeed(rtn)
 
-                rtn = loguploader.uploadlog(
-                    basepath=defaultDir,
-                    serialnumber=serialnumber,
-                    current_machine_id=currentMachineID,
-                )
-                servicemanager.LogInfoMsg(rtn)
-                any_uploaded = any_uploaded or loguploader.did_any_upload_succeed(rtn)
+class LumiLogUploadService(uploaddaemon.UploadDaemon):
+    """Luminosa Log Upload Service"""
 
-                if any_uploaded:
-                    rtn = loguploader.upload_client_version_if_needed(
-                        serialnumber=serialnumber,
-                        current_machine_id=currentMachineID,
-                    )
-                    servicemanager.LogInfoMsg(rtn)
-            except Exception as e:
-                # Never crash the service loop; log and continue next cycle
-                try:
-                    servicemanager.LogErrorMsg(f"Service loop error: {e}")
-                except Exception:
-                    pass
+    def __init__(self):
+        # Full reports go to rotating files; the Event Log gets periodic summaries
+        self._logging = uploaddaemon.start_logging(summary_writer=_write_event_log)
+        super().__init__(log=uploadlogging.LoggingSink())
 
-            # Sleep in small steps so stop() is responsive
-            slept = 0
-            while self.running and slept < interval:
-                time.sleep(1)
-                slept += 1
+    def run(self):
+        try:
+            super().run()
+        finally:
+            self._logging.stop()
 
 
 class LumiLogUploadServiceFramework(win32serviceutil.ServiceFramework):
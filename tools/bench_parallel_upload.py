@@ -0,0 +1,79 @@
+"""Compare single-stream and parallel chunked upload against the local stand-in.
+
+    python tools/bench_parallel_upload.py --size-mb 40 --latency-ms 50 --per-connection-kbps 8000
+
+Starts tools/webdav_standin.py in-process with the given latency and
+per-connection bandwidth cap, uploads the same random archive once with a
+single PUT and once via chunking v2 with N connections, and prints the
+effective throughput of each.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import webdav_standin  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=float, default=40.0)
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--per-connection-kbps", type=float, default=8000.0)
+    ap.add_argument("--connections", type=int, default=4)
+    ap.add_argument("--chunk-mb", type=float, default=5.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, link = webdav_standin.start_in_thread(
+            os.path.join(tmp, "server"), args.latency_ms, args.per_connection_kbps
+        )
+        # The uploader resolves its state folder from PROGRAMDATA: keep the
+        # benchmark's transport statistics out of the real transport cache
+        os.environ["PROGRAMDATA"] = os.path.join(tmp, "state")
+        import loguploader
+
+        # settings.public_link would win over PUBLIC_LINK: set it directly
+        loguploader.settings.public_link = link
+        loguploader.CHUNK_UPLOAD_URL = ""
+        if loguploader._get_public_link() != link:
+            print("Refusing to run: uploads would not go to the local stand-in", file=sys.stderr)
+            server.shutdown()
+            return 2
+        loguploader.PARALLEL_UPLOAD_CONNECTIONS = args.connections
+        loguploader.PARALLEL_UPLOAD_CHUNK_MB = args.chunk_mb
+
+        path = os.path.join(tmp, "bench.zip")
+        size = int(args.size_mb * 1024 * 1024)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+
+        results = []
+        for label, put in (
+            ("single PUT", loguploader._public_dav_put_file),
+            (f"chunked x{args.connections}", loguploader._public_dav_put_file_chunked),
+        ):
+            remote = f"bench_{len(results)}.zip"
+            t0 = time.perf_counter()
+            put(path, remote)
+            elapsed = time.perf_counter() - t0
+            received = os.path.getsize(os.path.join(tmp, "server", "files", remote))
+            if received != size:
+                print(f"{label}: size mismatch ({received} != {size})", file=sys.stderr)
+                return 1
+            results.append((label, elapsed))
+            print(f"{label:>14}: {elapsed:7.2f} s  {size / elapsed / 1e6 * 8:8.1f} Mbit/s")
+
+        server.shutdown()
+        print(f"speedup: {results[0][1] / results[1][1]:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,269 @@
+"""Index a drop folder of uploaded archives into a SQLite catalog.
+
+Parses the names written by the uploader:
+
+    <serial>_<machine>_<log name>.zip                      uploadlog           -> log
+    <serial>_<machine>_<log name>.digest.json              log digests         -> log_digest
+    <serial>_<machine>_LaserPower_<YYYYmmddHHMMSS>.zip     uploadLaserPowerLog -> laserpower
+    <serial>_<machine>_<name>_<YYYYmmddHHMMSS>[.diff].zip  uploadSettings      -> settings[_diff]
+    <serial>_<machine>_UserSettings_<name>_<ts>[.diff].zip uploadUserSettings  -> user_settings[_diff]
+    <serial>_<machine>_client_version_<YYYYmmdd>.json      heartbeat           -> client_version
+
+in the flat and in the partitioned (<serial>/<YYYY>/<MM>/) layout. Runs are
+incremental: files already in the catalog with unchanged size and mtime are
+skipped; new arrivals are opened in parallel (zip central directory and the
+small JSON members only, never the full log).
+
+    python tools/build_catalog.py --drop ./drop --db catalog.sqlite
+    python tools/build_catalog.py --drop ./drop --db catalog.sqlite --workers 16 --prune --summary
+
+    sqlite3 catalog.sqlite "SELECT name, timestamp FROM archives WHERE serial='1234567' AND kind='log' ORDER BY timestamp"
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+CATALOG_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS archives (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    serial TEXT,
+    machine_id TEXT,
+    kind TEXT NOT NULL,
+    name TEXT,
+    timestamp TEXT,
+    entry TEXT,
+    entry_size INTEGER,
+    entry_crc INTEGER,
+    details TEXT,
+    error TEXT,
+    ingested_utc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archives_serial ON archives (serial, kind, timestamp);
+CREATE INDEX IF NOT EXISTS archives_machine ON archives (machine_id, timestamp);
+CREATE INDEX IF NOT EXISTS archives_kind ON archives (kind, timestamp);
+"""
+
+_NAME_RE = re.compile(r"^(?P<serial>[^_]+)_(?P<machine>[^_]+)_(?P<rest>.+)$")
+_TS14_RE = re.compile(r"^(?P<stem>.+)_(?P<ts>\d{14})$")
+_LOG_TS_RE = re.compile(r"(\d{8})_(\d{6})")
+_DAY_RE = re.compile(r"^client_version_(?P<day>\d{8})$")
+
+
+def _iso(ts: str) -> str:
+    """YYYYmmdd[HHMMSS] -> ISO 8601 (the instrument's local time, as in the name)."""
+    fmt = "%Y%m%d%H%M%S" if len(ts) == 14 else "%Y%m%d"
+    try:
+        return datetime.datetime.strptime(ts, fmt).isoformat()
+    except ValueError:
+        return None
+
+
+def classify(filename: str):
+    """Return (serial, machine_id, kind, name, timestamp) from an uploaded file name, or None."""
+    if filename.endswith(".diff.zip"):
+        stem, diff = filename[: -len(".diff.zip")], True
+    elif filename.endswith(".digest.json"):
+        stem, diff = filename[: -len(".digest.json")], False
+    elif filename.endswith((".zip", ".json")):
+        stem, diff = os.path.splitext(filename)[0], False
+    else:
+        return None
+    m = _NAME_RE.match(stem)
+    if not m:
+        return None
+    serial, machine, rest = m.group("serial"), m.group("machine"), m.group("rest")
+
+    if filename.endswith(".digest.json"):
+        lt = _LOG_TS_RE.search(rest)
+        return serial, machine, "log_digest", rest, _iso(lt.group(1) + lt.group(2)) if lt else None
+    if filename.endswith(".json"):
+        d = _DAY_RE.match(rest)
+        if not d:
+            return None
+        return serial, machine, "client_version", "client_version", _iso(d.group("day"))
+
+    t = _TS14_RE.match(rest)
+    if t and t.group("stem") == "LaserPower":
+        return serial, machine, "laserpower", "LaserPower", _iso(t.group("ts"))
+    if t and t.group("stem").startswith("UserSettings_"):
+        kind = "user_settings_diff" if diff else "user_settings"
+        return serial, machine, kind, t.group("stem")[len("UserSettings_"):], _iso(t.group("ts"))
+    if t and (diff or not _LOG_TS_RE.search(t.group("stem"))):
+        # May still be a log whose name ends in 14 digits; inspect() checks the member
+        return serial, machine, "settings_diff" if diff else "settings", t.group("stem"), _iso(t.group("ts"))
+    if diff:
+        return None
+    lt = _LOG_TS_RE.search(rest)
+    return serial, machine, "log", rest, _iso(lt.group(1) + lt.group(2)) if lt else None
+
+
+def inspect(path: str, filename: str) -> dict:
+    """Parse name and (cheaply) content of one file; returns a catalog row."""
+    st = os.stat(path)
+    parsed = classify(filename)
+    row = {"size": st.st_size, "mtime": st.st_mtime, "kind": "unknown", "error": None, "details": None}
+    if parsed is None:
+        return row
+    row.update(zip(("serial", "machine_id", "kind", "name", "timestamp"), parsed))
+    details = {}
+    try:
+        if filename.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+            if row["kind"] == "client_version":
+                details = {
+                    "app_version": doc.get("app", {}).get("version"),
+                    "os": doc.get("os"),
+                    "stats": doc.get("stats"),
+                }
+            else:
+                details = {k: doc.get(k) for k in ("file", "lines", "levels", "first_timestamp", "last_timestamp")}
+        else:
+            with zipfile.ZipFile(path) as z:
+                infos = z.infolist()
+                meta = [i for i in infos if i.filename.endswith((".diff.json", ".meta.json"))]
+                data = [i for i in infos if i not in meta]
+                main = (data or meta or [None])[0]
+                if main is not None:
+                    row["entry"] = main.filename
+                    row["entry_size"] = main.file_size
+                    row["entry_crc"] = main.CRC
+                    if not row["timestamp"]:
+                        row["timestamp"] = datetime.datetime(*main.date_time).isoformat()
+                    if row["kind"] in ("settings", "settings_diff") and main.filename.lower().endswith(".pqlog"):
+                        row["kind"], row["name"] = "log", os.path.splitext(main.filename)[0]
+                for info in meta:
+                    doc = json.loads(z.read(info).decode("utf-8"))
+                    details.update({k: v for k, v in doc.items() if k not in ("ops", "format")})
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["details"] = json.dumps(details, sort_keys=True) if details else None
+    return row
+
+
+def _scan(drop: str):
+    for dirpath, _, files in os.walk(drop):
+        for filename in files:
+            if filename.endswith((".zip", ".json")):
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, drop).replace(os.sep, "/"), path, filename
+
+
+def build(drop: str, db_path: str, workers: int = 8, prune: bool = False) -> dict:
+    db = sqlite3.connect(db_path)
+    db.executescript(_SCHEMA)
+    db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CATALOG_VERSION),))
+    known = {p: (s, m) for p, s, m in db.execute("SELECT path, size, mtime FROM archives")}
+
+    seen = set()
+    todo = []
+    for rel, path, filename in _scan(drop):
+        seen.add(rel)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if known.get(rel) == (st.st_size, st.st_mtime):
+            continue
+        todo.append((rel, path, filename))
+
+    def work(item):
+        rel, path, filename = item
+        try:
+            return rel, inspect(path, filename)
+        except OSError:
+            return rel, None
+
+    added = 0
+    now = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for rel, row in pool.map(work, todo):
+            if row is None:
+                continue
+            db.execute(
+                "INSERT OR REPLACE INTO archives (path, size, mtime, serial, machine_id, kind, name, timestamp,"
+                " entry, entry_size, entry_crc, details, error, ingested_utc)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    rel,
+                    row["size"],
+                    row["mtime"],
+                    row.get("serial"),
+                    row.get("machine_id"),
+                    row["kind"],
+                    row.get("name"),
+                    row.get("timestamp"),
+                    row.get("entry"),
+                    row.get("entry_size"),
+                    row.get("entry_crc"),
+                    row["details"],
+                    row["error"],
+                    now,
+                ),
+            )
+            added += 1
+            if added % 1000 == 0:
+                db.commit()
+
+    removed = 0
+    if prune:
+        gone = [p for p in known if p not in seen]
+        db.executemany("DELETE FROM archives WHERE path = ?", [(p,) for p in gone])
+        removed = len(gone)
+    db.commit()
+    db.close()
+    return {"scanned": len(seen), "ingested": added, "skipped": len(seen) - len(todo), "removed": removed}
+
+
+def print_summary(db_path: str) -> None:
+    db = sqlite3.connect(db_path)
+    rows = db.execute(
+        "SELECT serial, kind, COUNT(*), SUM(size), MIN(timestamp), MAX(timestamp)"
+        " FROM archives GROUP BY serial, kind ORDER BY serial, kind"
+    ).fetchall()
+    for serial, kind, count, size, first, last in rows:
+        print(f"{serial or '-':>10} {kind:<20} {count:7d} {size / 1024 / 1024:10.1f} MiB  {first} .. {last}")
+    errors = db.execute("SELECT COUNT(*) FROM archives WHERE error IS NOT NULL").fetchone()[0]
+    if errors:
+        print(f"{errors} files could not be read (see column 'error')")
+    db.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--drop", required=True, help="Drop folder with the uploaded files")
+    ap.add_argument("--db", required=True, help="SQLite catalog (created if missing)")
+    ap.add_argument("--workers", type=int, default=8, help="Files inspected in parallel")
+    ap.add_argument("--prune", action="store_true", help="Remove catalog rows of files no longer in the drop folder")
+    ap.add_argument("--summary", action="store_true", help="Print counts per serial and kind")
+    args = ap.parse_args()
+
+    if not os.path.isdir(args.drop):
+        print(f"Not a directory: {args.drop}", file=sys.stderr)
+        return 2
+    t0 = time.perf_counter()
+    result = build(args.drop, args.db, args.workers, args.prune)
+    print(
+        f"Scanned {result['scanned']}, ingested {result['ingested']}, skipped {result['skipped']},"
+        f" removed {result['removed']} in {time.perf_counter() - t0:.1f} s"
+    )
+    if args.summary:
+        print_summary(args.db)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
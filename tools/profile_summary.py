@@ -0,0 +1,100 @@
+"""Print hotspots and peak allocations of recorded uploader profiles.
+
+Profiles are written by `python loguploader.py --profile` or, with
+`profile = True` in settings.py, by the service (e.g. `loguploaderservice.exe
+debug`) into <state dir>/profiles/<timestamp>/.
+
+    python tools/profile_summary.py              # newest run
+    python tools/profile_summary.py --all        # every kept run
+    python tools/profile_summary.py --run 20261019_101500_000000 --top 25
+"""
+
+import argparse
+import io
+import json
+import os
+import pstats
+import sys
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def _profiles_root(explicit: str) -> str:
+    if explicit:
+        return explicit
+    import loguploader
+
+    return loguploader._profiles_dir()
+
+
+def summarize_run(run_dir: str, top: int) -> None:
+    print(f"=== {run_dir}")
+    summary = {}
+    try:
+        with open(os.path.join(run_dir, "summary.json"), "r", encoding="utf-8") as f:
+            summary = json.load(f).get("stages", {})
+    except Exception:
+        pass
+
+    stages = sorted({os.path.splitext(n)[0] for n in os.listdir(run_dir) if n.endswith(".prof")})
+    for stage in stages:
+        info = summary.get(stage, {})
+        peak = info.get("peak_traced_bytes")
+        peak_txt = f"{peak / 1024 / 1024:.1f} MiB" if peak is not None else "n/a"
+        sampled = info.get("peak_snapshot_bytes")
+        if sampled is not None:
+            peak_txt += f" (snapshot at {sampled / 1024 / 1024:.1f} MiB)"
+        print(f"\n--- {stage}: {info.get('seconds', 'n/a')} s, peak traced memory {peak_txt}")
+
+        out = io.StringIO()
+        stats = pstats.Stats(os.path.join(run_dir, f"{stage}.prof"), stream=out)
+        stats.strip_dirs().sort_stats("tottime").print_stats(top)
+        lines = out.getvalue().splitlines()
+        # Skip the pstats preamble; keep the table
+        start = next((i for i, line in enumerate(lines) if line.strip().startswith("ncalls")), 0)
+        print("\n".join(lines[start:]).rstrip())
+
+        for suffix, title in (
+            ("peak.tracemalloc", "top allocations at the sampled peak of"),
+            ("tracemalloc", "top allocations still held at end of"),
+        ):
+            snap_path = os.path.join(run_dir, f"{stage}.{suffix}")
+            if not os.path.exists(snap_path):
+                continue
+            snapshot = tracemalloc.Snapshot.load(snap_path).filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),)
+            )
+            print(f"\n  {title} {stage}:")
+            for stat in snapshot.statistics("lineno")[:top]:
+                frame = stat.traceback[0]
+                print(f"  {stat.size / 1024:10.1f} KiB {stat.count:7d} blocks  {frame.filename}:{frame.lineno}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", default="", help="Profiles folder (default: the uploader's state folder)")
+    ap.add_argument("--run", default="", help="Run folder name (default: newest)")
+    ap.add_argument("--all", action="store_true", help="Summarize every kept run")
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    root = _profiles_root(args.dir)
+    runs = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) if os.path.isdir(root) else []
+    if not runs:
+        print(f"No profiles in {root}", file=sys.stderr)
+        return 1
+    if args.run:
+        selected = [args.run]
+    elif args.all:
+        selected = runs
+    else:
+        selected = runs[-1:]
+    for run in selected:
+        summarize_run(os.path.join(root, run), args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""Rebuild full settings XML versions from diff-mode uploads.
+
+With settings_diff_upload enabled, the uploader sends full snapshots
+("<...>_<timestamp>.zip" containing the XML and "<name>.meta.json") and
+diffs ("<...>_<timestamp>.diff.zip" containing "<name>.diff.json"). Each
+diff names its parent archive, so every version can be restored by
+starting from a snapshot and applying diffs in order.
+
+    python tools/rebuild_settings_history.py --archives ./drop --out ./history
+
+Archives are collected from all subfolders, so the partitioned remote layout
+(<serial>/<YYYY>/<MM>/) works as downloaded. Writes one file per version:
+<out>/<archive name without .zip>/<name>. Exits 1 if no settings archive
+was found or diffs are left whose base is missing.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import zipfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import loguploader  # noqa: E402
+
+
+def _read_archive(path: str):
+    """Return (kind, name, payload) for a settings archive, or None if it is not one."""
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        for entry in names:
+            if entry.endswith(".diff.json"):
+                doc = json.loads(z.read(entry).decode("utf-8"))
+                return "diff", doc["file"], doc
+        for entry in names:
+            if entry.endswith(".meta.json"):
+                meta = json.loads(z.read(entry).decode("utf-8"))
+                return "full", meta["file"], z.read(meta["file"])
+        xml = [n for n in names if n.lower().endswith(".xml")]
+        if len(xml) == 1:
+            # Plain upload from before diff mode: also a full version
+            return "full", xml[0], z.read(xml[0])
+    return None
+
+
+def rebuild(archive_dir: str, out_dir: str) -> int:
+    # Parents are named by archive name alone; they may sit in another month's folder
+    archives = sorted(
+        glob.glob(os.path.join(archive_dir, "**", "*.zip"), recursive=True), key=os.path.basename
+    )
+    contents = {}
+    pending = []
+    for path in archives:
+        try:
+            info = _read_archive(path)
+        except (zipfile.BadZipFile, KeyError, ValueError):
+            continue
+        if info is None:
+            continue
+        kind, name, payload = info
+        remote = os.path.basename(path)
+        if kind == "full":
+            contents[remote] = (name, payload)
+        else:
+            pending.append((remote, name, payload))
+
+    # Apply diffs until no more parents can be resolved (archives may arrive out of order)
+    progress = True
+    while pending and progress:
+        progress = False
+        remaining = []
+        for remote, name, doc in pending:
+            parent = contents.get(doc.get("parent"))
+            if parent is None:
+                remaining.append((remote, name, doc))
+                continue
+            contents[remote] = (name, loguploader.apply_settings_diff(parent[1], doc))
+            progress = True
+        pending = remaining
+
+    for remote, (name, data) in contents.items():
+        target = os.path.join(out_dir, remote[: -len(".zip")], name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+
+    for remote, _, doc in pending:
+        print(f"Missing parent {doc.get('parent')} for {remote}", file=sys.stderr)
+    print(f"Rebuilt {len(contents)} versions into {os.path.abspath(out_dir)}")
+    if not contents and not pending:
+        print(f"No settings archives found under {os.path.abspath(archive_dir)}", file=sys.stderr)
+        return 1
+    return 1 if pending else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--archives", required=True, help="Directory with downloaded settings archives")
+    ap.add_argument("--out", required=True, help="Output directory for the rebuilt versions")
+    args = ap.parse_args()
+    return rebuild(args.archives, args.out)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,409 @@
+"""Synthetic Luminosa data directory generator and load-replay tool.
+
+Builds a tree that looks like what loguploader.init() and the upload stages
+expect, and replays timelines of file changes against it:
+
+    <root>/Logs/LastOpenSerial.txt
+    <root>/Logs/*.pqlog
+    <root>/*.xml
+    <root>/UserSettings/*.xml
+    <root>/LaserPower.log
+
+Commands:
+
+    # build a tree with 200 logs, log-normal sizes around 2 MB
+    python tools/synth_luminosa.py generate --root lab --logs 200 --size lognormal:2,1
+
+    # synthesize a timeline covering 8 hours of instrument activity
+    python tools/synth_luminosa.py timeline --out day.jsonl --hours 8
+
+    # record a timeline from a real data directory (polling)
+    python tools/synth_luminosa.py record --root "C:\\ProgramData\\PicoQuant\\Luminosa" --out field.jsonl
+
+    # replay it 120x faster, running an upload cycle every 300 simulated seconds
+    # against an in-process WebDAV stand-in (or --memory for no network at all)
+    python tools/synth_luminosa.py replay --root lab --timeline day.jsonl --speed 120 --cycle-seconds 300 --standin
+
+    # CI: fail unless every log of the timeline was uploaded
+    python tools/synth_luminosa.py replay --root lab --timeline day.jsonl --speed 600 --memory --check
+
+Timeline files are JSON lines: {"t": <seconds>, "op": <op>, "path": <relative>, ...}
+with op one of "log" (new .pqlog, "bytes"), "append" ("bytes"), "mutate"
+(settings XML attribute change), "serial" ("serial").
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LEVELS = (("INFO", 0.90), ("WARNING", 0.08), ("ERROR", 0.02))
+_MESSAGES = (
+    "Measurement started (file {n})",
+    "Measurement finished after {n} s",
+    "Laser {n} power set to {v} uW",
+    "Stage moved to x={v} y={n}",
+    "TCSPC count rate {n} cps",
+    "Detector {n} dead time {v} ns",
+    "Autofocus converged in {n} steps",
+    "USB transfer retried ({n})",
+    "Temperature sensor {n} reads {v} C",
+    "Timeout waiting for device {n}",
+)
+_SETTINGS_FILES = ("Luminosa.xml", "Hardware.xml", "Acquisition.xml")
+_USER_SETTINGS_FILES = ("Default.xml", "FLIM.xml", "FCS.xml", "Smfret.xml")
+
+
+def parse_size(spec: str):
+    """Return a callable giving a size in bytes for 'fixed:MB', 'uniform:MIN,MAX' or 'lognormal:MEDIAN_MB,SIGMA'."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    mb = 1024 * 1024
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: int(values[0] * mb)
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: int(rng.uniform(values[0], values[1]) * mb)
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-6))
+        return lambda rng: int(rng.lognormvariate(mu, values[1]) * mb)
+    raise ValueError(f"Invalid size distribution '{spec}'")
+
+
+def _log_line(rng: random.Random, when: datetime.datetime) -> str:
+    r = rng.random()
+    level = "INFO"
+    for name, p in _LEVELS:
+        if r < p:
+            level = name
+            break
+        r -= p
+    msg = rng.choice(_MESSAGES).format(n=rng.randint(0, 999), v=round(rng.uniform(0, 100), 2))
+    return f"{when:%Y-%m-%d %H:%M:%S}.{when.microsecond // 1000:03d} [{level}] {msg}\n"
+
+
+def write_pqlog(path: str, size: int, rng: random.Random) -> None:
+    when = datetime.datetime.now() - datetime.timedelta(hours=1)
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        while written < size:
+            when += datetime.timedelta(milliseconds=rng.randint(1, 2000))
+            line = _log_line(rng, when)
+            f.write(line)
+            written += len(line)
+
+
+def append_laser_power(path: str, size: int, rng: random.Random) -> None:
+    written = 0
+    with open(path, "a", encoding="utf-8", newline="\n") as f:
+        while written < size:
+            now = datetime.datetime.now()
+            line = f"{now:%Y-%m-%d %H:%M:%S};Laser{rng.randint(1, 4)};{rng.uniform(0, 50):.3f}\n"
+            f.write(line)
+            written += len(line)
+
+
+def write_settings_xml(path: str, rng: random.Random, entries: int = 50) -> None:
+    lines = ['<?xml version="1.0" encoding="utf-8"?>\n', "<Settings>\n"]
+    for i in range(entries):
+        lines.append(f'  <Entry name="Param{i}" value="{rng.randint(0, 10000)}" unit="au" />\n')
+    lines.append("</Settings>\n")
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(lines)
+
+
+def mutate_settings_xml(path: str, rng: random.Random, changes: int = 1) -> None:
+    """Change a few attribute values in place, like a user tweaking settings."""
+    if not os.path.isfile(path):
+        write_settings_xml(path, rng)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    entries = [i for i, line in enumerate(lines) if 'value="' in line]
+    for i in rng.sample(entries, min(changes, len(entries))):
+        head, _, rest = lines[i].partition('value="')
+        _, _, tail = rest.partition('"')
+        lines[i] = f'{head}value="{rng.randint(0, 10000)}"{tail}'
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(lines)
+
+
+def generate(root: str, serial: str, logs: int, size, laser_power_kb: float, seed: int) -> None:
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, "Logs"), exist_ok=True)
+    os.makedirs(os.path.join(root, "UserSettings"), exist_ok=True)
+    with open(os.path.join(root, "Logs", "LastOpenSerial.txt"), "w", encoding="utf-8") as f:
+        f.write(f"Serial {serial}\n")
+    start = datetime.datetime.now() - datetime.timedelta(days=logs)
+    for i in range(logs):
+        name = f"Luminosa_{start + datetime.timedelta(days=i):%Y%m%d_%H%M%S}_{i:05d}.pqlog"
+        write_pqlog(os.path.join(root, "Logs", name), size(rng), rng)
+    for name in _SETTINGS_FILES:
+        write_settings_xml(os.path.join(root, name), rng)
+    for name in _USER_SETTINGS_FILES:
+        write_settings_xml(os.path.join(root, "UserSettings", name), rng)
+    if laser_power_kb:
+        append_laser_power(os.path.join(root, "LaserPower.log"), int(laser_power_kb * 1024), rng)
+
+
+def synth_timeline(hours: float, size, logs_per_hour: float, mutations_per_hour: float, seed: int):
+    """Yield timeline events for a plausible instrument day."""
+    rng = random.Random(seed)
+    end = hours * 3600
+    events = []
+    t = 0.0
+    n = 0
+    while logs_per_hour and t < end:
+        t += rng.expovariate(logs_per_hour / 3600)
+        events.append({"t": round(t, 1), "op": "log", "path": f"Logs/Synth_{n:05d}.pqlog", "bytes": size(rng)})
+        n += 1
+    t = 0.0
+    names = [n for n in _SETTINGS_FILES] + [f"UserSettings/{n}" for n in _USER_SETTINGS_FILES]
+    while mutations_per_hour and t < end:
+        t += rng.expovariate(mutations_per_hour / 3600)
+        events.append({"t": round(t, 1), "op": "mutate", "path": rng.choice(names), "changes": rng.randint(1, 3)})
+    for t in range(60, int(end), 60):
+        events.append({"t": float(t), "op": "append", "path": "LaserPower.log", "bytes": 200})
+    events = [e for e in events if e["t"] < end]
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+def apply_event(root: str, event: dict, rng: random.Random) -> None:
+    path = os.path.join(root, *event["path"].split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    op = event["op"]
+    if op == "log":
+        write_pqlog(path, int(event.get("bytes", 0)), rng)
+    elif op == "append":
+        append_laser_power(path, int(event.get("bytes", 0)), rng)
+    elif op == "mutate":
+        mutate_settings_xml(path, rng, int(event.get("changes", 1)))
+    elif op == "serial":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Serial {event['serial']}\n")
+    else:
+        raise ValueError(f"Unknown timeline op '{op}'")
+
+
+def _snapshot(root: str) -> dict:
+    snap = {}
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if not (name.endswith(".pqlog") or name.endswith(".xml") or name in ("LaserPower.log", "LastOpenSerial.txt")):
+                continue
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            snap[os.path.relpath(full, root).replace(os.sep, "/")] = (st.st_size, st.st_mtime)
+    return snap
+
+
+def record(root: str, out: str, poll_seconds: float, duration: float) -> None:
+    """Poll root and write a timeline of the changes that were observed."""
+    start = time.monotonic()
+    prev = _snapshot(root)
+    with open(out, "w", encoding="utf-8") as f:
+        while not duration or time.monotonic() - start < duration:
+            time.sleep(poll_seconds)
+            cur = _snapshot(root)
+            t = round(time.monotonic() - start, 1)
+            for rel, (size, mtime) in sorted(cur.items()):
+                old = prev.get(rel)
+                if old == (size, mtime):
+                    continue
+                if rel.endswith(".xml"):
+                    event = {"t": t, "op": "mutate", "path": rel, "changes": 1}
+                elif rel.endswith("LastOpenSerial.txt"):
+                    with open(os.path.join(root, rel), "r", encoding="utf-8", errors="replace") as sf:
+                        serial = (sf.read().split() or ["0000000"])[-1]
+                    event = {"t": t, "op": "serial", "path": rel, "serial": serial}
+                elif old is None or rel.endswith(".pqlog") and size < old[0]:
+                    event = {"t": t, "op": "log", "path": rel, "bytes": size}
+                else:
+                    op = "append" if rel == "LaserPower.log" else "log"
+                    event = {"t": t, "op": op, "path": rel, "bytes": max(size - old[0], 0) if op == "append" else size}
+                f.write(json.dumps(event) + "\n")
+                f.flush()
+            prev = cur
+
+
+def _run_cycle(root: str, serial: str, machine_id: str) -> dict:
+    import loguploader
+
+    stats = {}
+    for name in ("uploadSettings", "uploadUserSettings", "uploadLaserPowerLog", "uploadlog"):
+        t0 = time.perf_counter()
+        rtn = getattr(loguploader, name)(root, serial, machine_id)
+        stats[name] = {
+            "seconds": round(time.perf_counter() - t0, 3),
+            "uploaded": rtn.count("Uploaded:"),
+            "failed": rtn.count("Upload Failed"),
+        }
+    return stats
+
+
+def replay(root: str, timeline: str, speed: float, cycle_seconds: float, serial: str, machine_id: str) -> dict:
+    """Apply timeline events at speed x real time and run upload cycles in between.
+
+    Returns the uploads per stage over all cycles and the logs left in Logs/.
+    """
+    import loguploader
+
+    with open(timeline, "r", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e["t"])
+    rng = random.Random(0)
+    os.makedirs(os.path.join(root, "Logs"), exist_ok=True)
+    serial_file = os.path.join(root, "Logs", "LastOpenSerial.txt")
+    if not os.path.exists(serial_file):
+        with open(serial_file, "w", encoding="utf-8") as f:
+            f.write(f"Serial {serial}\n")
+
+    # The uploader's waits are in real seconds; simulated time runs speed x faster
+    quiet = float(loguploader.FILE_QUIET_SECONDS)
+    saved = loguploader.FILE_QUIET_SECONDS, loguploader.GOVERNOR_ACTIVITY_SECONDS
+    loguploader.FILE_QUIET_SECONDS = quiet / speed
+    loguploader.GOVERNOR_ACTIVITY_SECONDS = float(saved[1]) / speed
+
+    uploaded = {}
+    start = time.monotonic()
+    next_cycle = cycle_seconds if cycle_seconds else None
+    # One more cycle after the last file has been quiet long enough to go out
+    end_t = (events[-1]["t"] if events else 0.0) + quiet
+    i = 0
+    try:
+        while i < len(events) or (next_cycle is not None and next_cycle <= end_t + cycle_seconds):
+            upcoming = events[i]["t"] if i < len(events) else math.inf
+            if next_cycle is not None and next_cycle <= upcoming:
+                due, run_cycle = next_cycle, True
+            else:
+                due, run_cycle = upcoming, False
+            wait = due / speed - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
+            if run_cycle:
+                t0 = time.perf_counter()
+                stats = _run_cycle(root, serial, machine_id)
+                print(json.dumps({"t": due, "cycle_s": round(time.perf_counter() - t0, 3), "stages": stats}))
+                for name, st in stats.items():
+                    uploaded[name] = uploaded.get(name, 0) + st["uploaded"]
+                next_cycle += cycle_seconds
+            else:
+                apply_event(root, events[i], rng)
+                i += 1
+    finally:
+        loguploader.FILE_QUIET_SECONDS, loguploader.GOVERNOR_ACTIVITY_SECONDS = saved
+    logs_left = len([n for n in os.listdir(os.path.join(root, "Logs")) if n.endswith(".pqlog")])
+    return {
+        "uploaded": uploaded,
+        "logs_in_timeline": sum(1 for e in events if e["op"] == "log" and e["path"].endswith(".pqlog")),
+        "logs_left": logs_left,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    g = sub.add_parser("generate", help="Create a synthetic data directory")
+    g.add_argument("--root", required=True)
+    g.add_argument("--serial", default="1234567")
+    g.add_argument("--logs", type=int, default=20)
+    g.add_argument("--size", default="lognormal:1,1", help="fixed:MB | uniform:MIN,MAX | lognormal:MEDIAN_MB,SIGMA")
+    g.add_argument("--laser-power-kb", type=float, default=64)
+    g.add_argument("--seed", type=int, default=0)
+
+    t = sub.add_parser("timeline", help="Synthesize a timeline of file changes")
+    t.add_argument("--out", required=True)
+    t.add_argument("--hours", type=float, default=8)
+    t.add_argument("--size", default="lognormal:1,1")
+    t.add_argument("--logs-per-hour", type=float, default=2)
+    t.add_argument("--mutations-per-hour", type=float, default=1)
+    t.add_argument("--seed", type=int, default=0)
+
+    r = sub.add_parser("record", help="Record a timeline by polling a real data directory")
+    r.add_argument("--root", required=True)
+    r.add_argument("--out", required=True)
+    r.add_argument("--poll-seconds", type=float, default=5)
+    r.add_argument("--duration", type=float, default=0, help="Seconds to record (0 = until interrupted)")
+
+    p = sub.add_parser("replay", help="Replay a timeline against the uploader")
+    p.add_argument("--root", required=True)
+    p.add_argument("--timeline", required=True)
+    p.add_argument("--speed", type=float, default=60, help="Acceleration factor")
+    p.add_argument("--cycle-seconds", type=float, default=300, help="Simulated seconds between upload cycles (0 = none)")
+    p.add_argument("--serial", default="1234567")
+    p.add_argument("--machine-id", default="00000000-0000-0000-0000-000000000000")
+    p.add_argument("--standin", action="store_true", help="Upload to an in-process WebDAV stand-in")
+    p.add_argument("--memory", action="store_true", help="Upload to the in-memory backend (no network)")
+    p.add_argument("--latency-ms", type=float, default=0)
+    p.add_argument("--per-connection-kbps", type=float, default=0)
+    p.add_argument("--state-dir", default="", help="Uploader state folder for the run (default: a new temp folder)")
+    p.add_argument("--check", action="store_true", help="Exit 1 unless every log of the timeline was uploaded")
+
+    args = ap.parse_args()
+
+    if args.command == "generate":
+        generate(args.root, args.serial, args.logs, parse_size(args.size), args.laser_power_kb, args.seed)
+        print(f"Generated {args.logs} logs under {os.path.abspath(args.root)}")
+    elif args.command == "timeline":
+        events = synth_timeline(args.hours, parse_size(args.size), args.logs_per_hour, args.mutations_per_hour, args.seed)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for e in events:
+                f.write(json.dumps(e) + "\n")
+        print(f"Wrote {len(events)} events to {args.out}")
+    elif args.command == "record":
+        try:
+            record(args.root, args.out, args.poll_seconds, args.duration)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "replay":
+        # Keep synthetic runs out of the real ledger, scan index, daily stats and
+        # transport cache: the uploader resolves its state folder from PROGRAMDATA
+        state_dir = args.state_dir or tempfile.mkdtemp(prefix="replay-state-")
+        os.environ["PROGRAMDATA"] = os.path.abspath(state_dir)
+        print(f"Uploader state in {state_dir}")
+        sys.path.insert(0, REPO_ROOT)
+        if args.standin:
+            sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+            import webdav_standin
+
+            server_root = tempfile.mkdtemp(prefix="standin-")
+            _, link = webdav_standin.start_in_thread(server_root, args.latency_ms, args.per_connection_kbps)
+            import loguploader
+
+            # settings.public_link would win over PUBLIC_LINK: override it and the backend
+            loguploader.settings.public_link = link
+            loguploader.CHUNK_UPLOAD_URL = ""
+            loguploader.set_backend(loguploader.NextcloudBackend())
+            if loguploader._get_public_link() != link:
+                print("Refusing to replay: uploads would not go to the local stand-in", file=sys.stderr)
+                return 2
+            print(f"Stand-in receiving into {server_root}")
+        if args.memory:
+            import loguploader
+
+            loguploader.set_backend(loguploader.MemoryBackend())
+        result = replay(args.root, args.timeline, args.speed, args.cycle_seconds, args.serial, args.machine_id)
+        print(json.dumps({"summary": result}))
+        if args.check and (result["logs_left"] or result["uploaded"].get("uploadlog", 0) < result["logs_in_timeline"]):
+            print(
+                f"Check failed: {result['uploaded'].get('uploadlog', 0)} of {result['logs_in_timeline']} logs uploaded,"
+                f" {result['logs_left']} left in Logs",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,230 @@
+"""Minimal local WebDAV stand-in for a Nextcloud public file-drop share.
+
+Serves the endpoints the uploader talks to:
+
+- PUT/HEAD/PROPFIND/DELETE  /public.php/dav/files/<token>/<path>
+- MKCOL/PUT/MOVE/DELETE     /public.php/dav/uploads/<token>/<upload-id>/...
+  (chunking v2: MOVE of "<upload-id>/.file" assembles the chunks)
+
+Latency and a per-connection bandwidth cap can be injected to model a
+long-haul link where a single TCP stream is limited by latency x window.
+
+    python tools/webdav_standin.py --root ./standin --port 8080 --latency-ms 80 --per-connection-kbps 2000
+
+Then point the uploader at it with
+PUBLIC_LINK=http://127.0.0.1:8080/index.php/s/standin
+"""
+
+import argparse
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # set by make_server()
+    root = "."
+    latency_s = 0.0
+    per_connection_bps = 0
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    # --- helpers ---
+    def _local_path(self):
+        """Map the request path to (kind, local path) or (None, None)."""
+        path = unquote(urlparse(self.path).path)
+        for kind in ("files", "uploads"):
+            prefix = f"/public.php/dav/{kind}/"
+            if path.startswith(prefix):
+                rest = path[len(prefix):].split("/", 1)
+                rel = rest[1] if len(rest) > 1 else ""
+                rel = os.path.normpath(rel).lstrip(os.sep)
+                if rel.startswith(".."):
+                    return None, None
+                return kind, os.path.join(self.root, kind, rel)
+        return None, None
+
+    def _delay(self):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not self.per_connection_bps:
+            return self.rfile.read(length)
+        # Pace the read to the per-connection rate
+        parts = []
+        block = 64 * 1024
+        start = time.monotonic()
+        received = 0
+        while received < length:
+            data = self.rfile.read(min(block, length - received))
+            if not data:
+                break
+            parts.append(data)
+            received += len(data)
+            due = received / self.per_connection_bps
+            elapsed = time.monotonic() - start
+            if due > elapsed:
+                time.sleep(due - elapsed)
+        return b"".join(parts)
+
+    def _reply(self, code: int, body: bytes = b"", headers=None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _destination(self):
+        dest = self.headers.get("Destination", "")
+        saved = self.path
+        self.path = urlparse(dest).path
+        try:
+            return self._local_path()
+        finally:
+            self.path = saved
+
+    # --- verbs ---
+    def do_PUT(self):
+        self._delay()
+        kind, local = self._local_path()
+        body = self._read_body()
+        if not kind:
+            return self._reply(404)
+        if not os.path.isdir(os.path.dirname(local)):
+            # Like Nextcloud: parent collections must be created with MKCOL first
+            return self._reply(409)
+        existed = os.path.exists(local)
+        with open(local, "wb") as f:
+            f.write(body)
+        self._reply(204 if existed else 201)
+
+    def do_MKCOL(self):
+        self._delay()
+        kind, local = self._local_path()
+        if not kind:
+            return self._reply(404)
+        if os.path.exists(local):
+            return self._reply(405)
+        if not os.path.isdir(os.path.dirname(local)):
+            return self._reply(409)
+        os.mkdir(local)
+        self._reply(201)
+
+    def do_MOVE(self):
+        self._delay()
+        kind, local = self._local_path()
+        dest_kind, dest = self._destination()
+        if not kind or dest_kind != "files":
+            return self._reply(400)
+        if not os.path.isdir(os.path.dirname(dest)):
+            return self._reply(409)
+        if kind == "uploads" and os.path.basename(local) == ".file":
+            upload_dir = os.path.dirname(local)
+            if not os.path.isdir(upload_dir):
+                return self._reply(404)
+            with open(dest, "wb") as out:
+                for name in sorted(os.listdir(upload_dir)):
+                    with open(os.path.join(upload_dir, name), "rb") as f:
+                        shutil.copyfileobj(f, out)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            return self._reply(201)
+        if not os.path.exists(local):
+            return self._reply(404)
+        os.replace(local, dest)
+        self._reply(201)
+
+    def do_DELETE(self):
+        self._delay()
+        kind, local = self._local_path()
+        if not kind or not os.path.exists(local):
+            return self._reply(404)
+        if os.path.isdir(local):
+            shutil.rmtree(local, ignore_errors=True)
+        else:
+            os.remove(local)
+        self._reply(204)
+
+    def do_HEAD(self):
+        self._delay()
+        kind, local = self._local_path()
+        if not kind or not os.path.isfile(local):
+            return self._reply(404)
+        self.send_response(200)
+        self.send_header("Content-Length", str(os.path.getsize(local)))
+        self.end_headers()
+
+    def do_PROPFIND(self):
+        self._delay()
+        self._read_body()
+        kind, local = self._local_path()
+        if not kind or not os.path.exists(local):
+            return self._reply(404)
+        size = os.path.getsize(local) if os.path.isfile(local) else 0
+        body = (
+            '<?xml version="1.0"?>'
+            '<d:multistatus xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+            f"<d:response><d:href>{self.path}</d:href><d:propstat><d:prop>"
+            f"<d:getcontentlength>{size}</d:getcontentlength>"
+            "</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>"
+            "</d:multistatus>"
+        ).encode()
+        self._reply(207, body, {"Content-Type": "application/xml; charset=utf-8"})
+
+
+def make_server(root: str, port: int = 0, latency_ms: float = 0.0, per_connection_kbps: float = 0.0):
+    handler = type(
+        "ConfiguredStandinHandler",
+        (StandinHandler,),
+        {
+            "root": os.path.abspath(root),
+            "latency_s": latency_ms / 1000.0,
+            "per_connection_bps": int(per_connection_kbps * 1000 / 8),
+        },
+    )
+    os.makedirs(os.path.join(root, "files"), exist_ok=True)
+    os.makedirs(os.path.join(root, "uploads"), exist_ok=True)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(root: str, latency_ms: float = 0.0, per_connection_kbps: float = 0.0):
+    """Start a stand-in on a free port; returns (server, public_link)."""
+    server = make_server(root, 0, latency_ms, per_connection_kbps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/index.php/s/standin"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="standin", help="Directory receiving uploaded files")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every request")
+    ap.add_argument(
+        "--per-connection-kbps", type=float, default=0.0, help="Cap request bodies per connection (0 = unlimited)"
+    )
+    args = ap.parse_args()
+
+    server = make_server(args.root, args.port, args.latency_ms, args.per_connection_kbps)
+    host, port = server.server_address[:2]
+    print(f"Serving {os.path.abspath(args.root)} at http://{host}:{port}/index.php/s/standin")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,342 @@
+"""Platform-neutral upload daemon: the service's scheduling loop without win32.
+
+UploadDaemon runs the upload cycle, the adaptive interval, the status endpoint
+and profiling. It reports through a log sink (anything with info() and
+error()), so the Windows service (loguploaderservice.py) and the foreground
+runner below are thin wrappers around the same engine.
+
+Foreground / systemd-style runner (logs to stdout, stops on SIGTERM/SIGINT):
+
+    python uploaddaemon.py                  # run until stopped
+    python uploaddaemon.py --once           # one cycle, exit 1 if it failed
+    python uploaddaemon.py --cycles 5 --dir ./lab
+"""
+
+import contextlib
+import datetime
+import os
+import signal
+import sys
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+import loguploader
+import uploadlogging
+import uploadstatus
+
+
+class PrintLogSink:
+    """Timestamped lines on stdout/stderr, written synchronously (tests, debugging)."""
+
+    def _write(self, stream, level, msg):
+        stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for line in str(msg).rstrip("\n").splitlines() or [""]:
+            stream.write(f"{stamp} [{level}] {line}\n")
+        stream.flush()
+
+    def info(self, msg, **fields):
+        self._write(sys.stdout, "INFO", msg)
+
+    def error(self, msg, **fields):
+        self._write(sys.stderr, "ERROR", msg)
+
+
+def start_logging(console: bool = False, summary_writer=None) -> uploadlogging.LoggingPipeline:
+    """Start the buffered logging pipeline configured by settings.py."""
+    return uploadlogging.start_logging(
+        log_dir=loguploader.LOG_DIR or os.path.join(loguploader._client_version_state_dir(), "logs"),
+        max_bytes=loguploader.LOG_MAX_BYTES,
+        backup_count=loguploader.LOG_BACKUP_COUNT,
+        console=console,
+        summary_writer=summary_writer,
+        summary_seconds=loguploader.EVENTLOG_SUMMARY_SECONDS,
+        queue_size=loguploader.LOG_QUEUE_SIZE,
+    )
+
+
+class UploadDaemon:
+    """Runs upload cycles until stop() is called."""
+
+    def __init__(self, log=None, basepath=None):
+        self.log = log or PrintLogSink()
+        # None: use the data folder found by loguploader.init()
+        self.basepath = basepath
+        self._stop_event = threading.Event()
+        self.status = uploadstatus.ServiceStatus()
+        self._status_server = None
+        self._profiler = None
+        self.consecutive_failures = 0
+        self.cycles = 0
+
+    def stop(self):
+        """Stop the loop; an ongoing wait returns immediately."""
+        self._stop_event.set()
+
+    def _start_status_server(self):
+        if not loguploader.STATUS_PORT:
+            return
+        try:
+            self._status_server = uploadstatus.start_status_server(
+                self.status, loguploader.STATUS_PORT
+            )
+            self.log.info(f"Status endpoint: http://127.0.0.1:{loguploader.STATUS_PORT}/status")
+        except Exception as e:
+            self.log.error(f"Status endpoint not started: {e}")
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        """Track a stage in the status and, with settings.profile, profile it."""
+        with self.status.stage(name):
+            if self._profiler is None:
+                yield
+            else:
+                with self._profiler.stage(name):
+                    yield
+
+    def _note_result(self, rtn, **fields):
+        self.log.info(rtn, **fields)
+        failure = uploadstatus.first_failure_line(rtn)
+        if failure:
+            self.status.set_error(failure)
+
+    def _run_stages(self, defaultDir, serialnumber, currentMachineID, label="", copy_db=True):
+        """Run the upload stages once. Returns (any_uploaded, any_failed).
+
+        label prefixes the stage names (data root key in multi-root mode).
+        copy_db is False for roots of other instruments (mounted shares): this
+        PC's PQDevice files do not belong there.
+        """
+        fields = {"root": label[:-1]} if label else {}
+        if copy_db:
+            with self._stage(label + "copyDB"):
+                rtn = loguploader.copyDB(basepath=defaultDir)
+            self.log.info(rtn, stage="copyDB", **fields)
+
+        any_uploaded = False
+        any_failed = False
+        for name, fn in (
+            ("uploadSettings", loguploader.uploadSettings),
+            ("uploadUserSettings", loguploader.uploadUserSettings),
+            ("uploadLaserPowerLog", loguploader.uploadLaserPowerLog),
+            ("uploadlog", loguploader.uploadlog),
+        ):
+            if loguploader.cycle_lease_lost():
+                self.log.info(f"{label}Cycle lease lost to another uploader; skipping the remaining stages")
+                break
+            with self._stage(label + name):
+                rtn = fn(
+                    basepath=defaultDir,
+                    serialnumber=serialnumber,
+                    current_machine_id=currentMachineID,
+                )
+            self._note_result(rtn, stage=name, **fields)
+            any_uploaded = any_uploaded or loguploader.did_any_upload_succeed(rtn)
+            any_failed = any_failed or loguploader.did_any_upload_fail(rtn)
+
+        # Daily heartbeat; sent even on idle days so quiet instruments stay visible
+        with self._stage(label + "client_version"):
+            rtn = loguploader.upload_client_version_if_needed(
+                serialnumber=serialnumber,
+                current_machine_id=currentMachineID,
+            )
+        self.log.info(rtn, stage="client_version", **fields)
+        return any_uploaded, any_failed
+
+    def _cycle_root(self, basepath, serialnumber, currentMachineID, label="", copy_db=True):
+        """Run the stages of one data root under its cycle lease.
+
+        Returns (any_uploaded, any_failed, backlog_files, backlog_bytes).
+        """
+        any_uploaded = False
+        any_failed = False
+        with loguploader.cycle_lease(basepath) as held:
+            if held:
+                any_uploaded, any_failed = self._run_stages(
+                    basepath, serialnumber, currentMachineID, label, copy_db
+                )
+            else:
+                # The CLI (or another instance) is working; let it finish
+                self.log.info(f"{label}Another uploader is running; skipping this cycle")
+        backlog, backlog_bytes = loguploader.backlog_stats(basepath)
+        return any_uploaded, any_failed, backlog, backlog_bytes
+
+    def _cycle_roots(self, defaultDir, currentMachineID):
+        """Run all configured data roots concurrently; results are summed up."""
+        roots = loguploader.data_roots(currentMachineID, defaultDir)
+        if not roots:
+            return False, False, 0, 0
+        # Rotate the start order so no root is always served last
+        shift = self.cycles % len(roots)
+        roots = roots[shift:] + roots[:shift]
+        # tracemalloc is process-wide: profile roots one after the other
+        workers = 1 if self._profiler else max(1, min(int(loguploader.MULTI_ROOT_WORKERS), len(roots)))
+
+        def work(root):
+            with loguploader.root_context(root["key"]):
+                self.log.info(
+                    f"Root {root['key']}: {root['path']} (serial {root['serial']}, ID {root['machine_id']})"
+                )
+                try:
+                    result = self._cycle_root(
+                        root["path"], root["serial"], root["machine_id"], root["key"] + "-", root["local"]
+                    )
+                except Exception as e:
+                    self.status.set_error(f"Root {root['key']} error: {e}")
+                    self.log.error(f"Root {root['key']} error: {e}")
+                    result = (False, True, 0, 0)
+                loguploader.daily_stats_record_cycle(*result)
+                return result
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="root") as pool:
+            results = list(pool.map(work, roots))
+        return (
+            any(r[0] for r in results),
+            any(r[1] for r in results),
+            sum(r[2] for r in results),
+            sum(r[3] for r in results),
+        )
+
+    def run_cycle(self) -> dict:
+        """Run one cycle and return its outcome, including the next interval."""
+        any_uploaded = False
+        any_failed = False
+        backlog = 0
+        backlog_bytes = 0
+        self.status.begin_cycle()
+        if loguploader.PROFILE:
+            try:
+                self._profiler = loguploader.CycleProfiler()
+            except Exception as e:
+                self.log.error(f"Profiling not started: {e}")
+        try:
+            self.log.info("Service running...")
+            with self._stage("init"):
+                [defaultDir, serialnumber, currentMachineID] = loguploader.init()
+            if self.basepath:
+                defaultDir = self.basepath
+                serialnumber = loguploader.getLumiSerial(os.path.abspath(defaultDir))
+            self.log.info(f"Log Directory: {defaultDir}")
+            self.log.info(f"System Serial Number: {serialnumber}")
+            self.log.info(f"ID: {currentMachineID}")
+
+            if loguploader.DATA_ROOTS:
+                any_uploaded, any_failed, backlog, backlog_bytes = self._cycle_roots(
+                    defaultDir, currentMachineID
+                )
+            else:
+                any_uploaded, any_failed, backlog, backlog_bytes = self._cycle_root(
+                    defaultDir, serialnumber, currentMachineID
+                )
+            self.status.set_transports(loguploader.transport_stats())
+        except Exception as e:
+            # Never crash the loop; log and continue next cycle
+            any_failed = True
+            self.status.set_error(f"Service loop error: {e}")
+            try:
+                self.log.error(f"Service loop error: {e}")
+            except Exception:
+                pass
+        finally:
+            if self._profiler is not None:
+                self._profiler.close()
+                self.log.info(f"Profile written to {self._profiler.directory}")
+                self._profiler = None
+
+        self.cycles += 1
+        if any_failed and not any_uploaded:
+            self.consecutive_failures += 1
+        else:
+            self.consecutive_failures = 0
+        interval = loguploader.next_service_interval(
+            uploaded=any_uploaded,
+            failed=any_failed,
+            backlog=backlog,
+            consecutive_failures=self.consecutive_failures,
+        )
+        if not loguploader.DATA_ROOTS:
+            # Multi-root cycles are counted per root in _cycle_roots
+            loguploader.daily_stats_record_cycle(any_uploaded, any_failed, backlog, backlog_bytes)
+        self.status.end_cycle(
+            backlog_files=backlog,
+            backlog_bytes=backlog_bytes,
+            uploaded=any_uploaded,
+            failed=any_failed,
+            consecutive_failures=self.consecutive_failures,
+            next_interval=interval,
+        )
+        try:
+            self.log.info(
+                f"Next cycle in {interval:.0f} s (backlog={backlog}, failures={self.consecutive_failures})",
+                event="cycle",
+                uploaded=any_uploaded,
+                failed=any_failed,
+                backlog_files=backlog,
+                backlog_bytes=backlog_bytes,
+                next_interval=interval,
+            )
+        except Exception:
+            pass
+        return {
+            "uploaded": any_uploaded,
+            "failed": any_failed,
+            "backlog_files": backlog,
+            "backlog_bytes": backlog_bytes,
+            "next_interval": interval,
+        }
+
+    def run(self, max_cycles=None):
+        """Main loop: run cycles until stop() (or max_cycles). Returns the last outcome."""
+        self._start_status_server()
+        note = loguploader.apply_governor_priority()
+        if note:
+            self.log.info(note)
+        outcome = None
+        cycles = 0
+        try:
+            while not self._stop_event.is_set():
+                outcome = self.run_cycle()
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+                # Wait on the stop event so stop() takes effect immediately
+                self._stop_event.wait(outcome["next_interval"])
+        finally:
+            # Also reached through stop(): run() owns the status server
+            if self._status_server is not None:
+                self._status_server.shutdown()
+                self._status_server.server_close()
+                self._status_server = None
+        return outcome
+
+
+def main() -> int:
+    parser = ArgumentParser(description="Run the log upload daemon in the foreground")
+    parser.add_argument("--dir", default=None, help="Data folder (default: platform default from init())")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    parser.add_argument("--cycles", type=int, default=None, help="Stop after this many cycles")
+    args = parser.parse_args()
+
+    # stdout for journald, rotating files for later searches
+    pipeline = start_logging(console=True)
+    daemon = UploadDaemon(log=uploadlogging.LoggingSink(), basepath=args.dir)
+
+    def _on_signal(signum, frame):
+        daemon.log.info(f"Signal {signum} received, stopping")
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, _on_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _on_signal)
+
+    try:
+        outcome = daemon.run(max_cycles=1 if args.once else args.cycles)
+    finally:
+        pipeline.stop()
+    if outcome and outcome["failed"] and not outcome["uploaded"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+"""Buffered logging for the uploader: nothing on the upload path waits for log I/O.
+
+Records go into a bounded queue (dropped and counted when it is full) and a
+background thread writes them to:
+
+- rotating JSON-lines files (one record per report line, with stage, root
+  and event fields), size-bounded by max_bytes x backup_count
+- optionally the console, as plain messages
+- optionally a summary writer (the Windows Event Log in the service) that
+  gets at most one summary per summary_seconds instead of every report
+
+    pipeline = start_logging("/var/log/loguploader", console=True)
+    sink = LoggingSink()
+    sink.info(report, stage="uploadlog")
+    ...
+    pipeline.stop()
+"""
+
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOGGER_NAME = "loguploader"
+
+# Attributes every LogRecord has; everything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def classify_report_line(line: str) -> str:
+    """Event name of one line of a stage report."""
+    if line.startswith("Uploaded:"):
+        return "uploaded"
+    if line.startswith("Upload Failed") or line.startswith("Connection failed"):
+        return "failed"
+    if line.startswith("Digest "):
+        return "digest"
+    if line.startswith(
+        ("Skipped", "File still changing", "Acquisition active", "Per-cycle quota", "Cycle lease lost")
+    ):
+        return "deferred"
+    if line.startswith("Already uploaded"):
+        return "duplicate"
+    return "info"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, message and the extra fields."""
+
+    def format(self, record):
+        doc = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                doc[key] = value
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room for the sentinel instead of raising queue.Full."""
+
+    def enqueue_sentinel(self):
+        # The writer thread keeps draining, so a full queue frees up
+        self.queue.put(self._sentinel)
+
+
+class SummaryHandler(logging.Handler):
+    """Condenses records into a periodic summary for a slow sink.
+
+    writer(level, text) is called from the logging thread at most once per
+    summary_seconds, when a cycle ends or an error arrives, and on close().
+    """
+
+    def __init__(self, writer, summary_seconds: float = 300, dropped=lambda: 0):
+        super().__init__()
+        self.writer = writer
+        self.summary_seconds = float(summary_seconds)
+        self.dropped = dropped
+        self._last_flush = None
+        self._since = time.time()
+        self._dropped_reported = 0
+        self._reset()
+
+    def _reset(self):
+        self.cycles = 0
+        self.events = {}
+        self.errors = []
+        self.error_count = 0
+
+    def emit(self, record):
+        event = getattr(record, "event", "info")
+        if event == "cycle":
+            self.cycles += 1
+        else:
+            self.events[event] = self.events.get(event, 0) + 1
+        if record.levelno >= logging.WARNING and event != "cycle":
+            self.error_count += 1
+            if len(self.errors) < 5:
+                self.errors.append(record.getMessage()[:300])
+        due = self._last_flush is None or time.time() - self._last_flush >= self.summary_seconds
+        if due and (event == "cycle" or record.levelno >= logging.ERROR):
+            self.flush_summary()
+
+    def flush_summary(self):
+        notable = self.cycles or self.error_count or any(k != "info" for k in self.events)
+        if not notable and self.dropped() <= self._dropped_reported:
+            # Only startup/progress lines: nothing worth an Event Log entry
+            return
+        since = datetime.datetime.fromtimestamp(self._since).strftime("%Y-%m-%d %H:%M:%S")
+        counts = ", ".join(f"{k}={v}" for k, v in sorted(self.events.items()) if k != "info")
+        text = f"Since {since}: {self.cycles} cycles" + (f", {counts}" if counts else "")
+        dropped = self.dropped()
+        if dropped > self._dropped_reported:
+            text += f", {dropped - self._dropped_reported} log records dropped"
+            self._dropped_reported = dropped
+        if self.errors:
+            text += f"\n{self.error_count} warnings/errors, first:\n" + "\n".join(self.errors)
+        try:
+            self.writer("error" if self.error_count else "info", text)
+        except Exception:
+            pass
+        self._last_flush = self._since = time.time()
+        self._reset()
+
+    def close(self):
+        self.flush_summary()
+        super().close()
+
+
+class LoggingPipeline:
+    """The queue, its writer thread and handlers; stop() drains and closes them."""
+
+    def __init__(self, listener, queue_handler, handlers):
+        self.listener = listener
+        self.queue_handler = queue_handler
+        self.handlers = handlers
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped
+
+    def stop(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.removeHandler(self.queue_handler)
+        try:
+            self.listener.stop()
+        finally:
+            for handler in self.handlers:
+                handler.close()
+
+
+def start_logging(
+    log_dir: str = "",
+    max_bytes: int = 5 * 1024 * 1024,
+    backup_count: int = 5,
+    console: bool = False,
+    summary_writer=None,
+    summary_seconds: float = 300,
+    queue_size: int = 10000,
+    filename: str = "loguploader.log",
+) -> LoggingPipeline:
+    """Route the "loguploader" logger through a background writer thread.
+
+    Each process needs its own filename in log_dir: rotation renames the file,
+    which fails on Windows while another process holds it open.
+    """
+    q = queue.Queue(maxsize=max(1, int(queue_size)))
+    queue_handler = _DroppingQueueHandler(q)
+    handlers = []
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, filename),
+            maxBytes=int(max_bytes),
+            backupCount=int(backup_count),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    if console:
+        # stdout, like the plain reports before (journald, shell redirection)
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(stream)
+    if summary_writer is not None:
+        handlers.append(SummaryHandler(summary_writer, summary_seconds, lambda: queue_handler.dropped))
+
+    listener = _QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(queue_handler)
+    return LoggingPipeline(listener, queue_handler, handlers)
+
+
+class LoggingSink:
+    """Log sink for UploadDaemon and the CLI; splits stage reports into one record per line."""
+
+    def __init__(self, logger_name: str = LOGGER_NAME):
+        self.logger = logging.getLogger(logger_name)
+
+    def _emit(self, level, msg, fields):
+        for line in str(msg).rstrip("\n").splitlines() or [""]:
+            extra = dict(fields)
+            extra.setdefault("event", classify_report_line(line))
+            # Failed uploads are retried later: warnings, not errors
+            line_level = max(level, logging.WARNING) if extra["event"] == "failed" else level
+            self.logger.log(line_level, line, extra=extra)
+
+    def info(self, msg, **fields):
+        self._emit(logging.INFO, msg, fields)
+
+    def error(self, msg, **fields):
+        self._emit(logging.ERROR, msg, fields)
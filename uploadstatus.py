@@ -0,0 +1,147 @@
+"""Live status of the upload service and an optional localhost status endpoint.
+
+The service updates a ServiceStatus while it works; start_status_server()
+exposes it read-only on 127.0.0.1 so monitoring can poll it cheaply:
+
+    GET /status  -> JSON snapshot
+    GET /health  -> {"ok": true|false}, HTTP 200 or 503
+"""
+
+import contextlib
+import copy
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _utc_now() -> str:
+    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+class ServiceStatus:
+    """Thread-safe record of what the service is doing and how the last cycle went."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cycle_start = None
+        self._data = {
+            "started_utc": _utc_now(),
+            "stage": "idle",
+            "cycle": 0,
+            "cycle_started_utc": None,
+            "backlog_files": 0,
+            "backlog_bytes": 0,
+            "last_cycle": None,
+            "breaker": {"state": "closed", "consecutive_failures": 0},
+            "next_cycle_in_s": None,
+            "last_error": None,
+            "last_error_utc": None,
+            "transports": None,
+        }
+        self._stage_timings = {}
+
+    def begin_cycle(self) -> None:
+        with self._lock:
+            self._cycle_start = time.perf_counter()
+            self._stage_timings = {}
+            self._data["cycle"] += 1
+            self._data["cycle_started_utc"] = _utc_now()
+            self._data["next_cycle_in_s"] = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Mark name as the current stage and time it."""
+        with self._lock:
+            self._data["stage"] = name
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stage_timings[name] = round(time.perf_counter() - t0, 3)
+
+    def set_error(self, message: str) -> None:
+        with self._lock:
+            self._data["last_error"] = message
+            self._data["last_error_utc"] = _utc_now()
+
+    def set_transports(self, stats: dict) -> None:
+        with self._lock:
+            self._data["transports"] = stats
+
+    def end_cycle(
+        self,
+        backlog_files: int,
+        backlog_bytes: int,
+        uploaded: bool,
+        failed: bool,
+        consecutive_failures: int,
+        next_interval: float,
+    ) -> None:
+        with self._lock:
+            duration = None
+            if self._cycle_start is not None:
+                duration = round(time.perf_counter() - self._cycle_start, 3)
+            self._data["stage"] = "waiting"
+            self._data["backlog_files"] = backlog_files
+            self._data["backlog_bytes"] = backlog_bytes
+            self._data["last_cycle"] = {
+                "finished_utc": _utc_now(),
+                "duration_s": duration,
+                "stages_s": dict(self._stage_timings),
+                "uploaded": uploaded,
+                "failed": failed,
+            }
+            # The failure backoff acts as the service's circuit breaker
+            self._data["breaker"] = {
+                "state": "open" if consecutive_failures else "closed",
+                "consecutive_failures": consecutive_failures,
+            }
+            self._data["next_cycle_in_s"] = round(next_interval, 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def healthy(self) -> bool:
+        with self._lock:
+            return self._data["breaker"]["state"] == "closed"
+
+
+def first_failure_line(returntxt: str):
+    """Return the first failure line of a stage's report, or None."""
+    for line in (returntxt or "").splitlines():
+        if line.startswith("Upload Failed") or line.startswith("Connection failed"):
+            return line
+    return None
+
+
+def start_status_server(status: ServiceStatus, port: int) -> ThreadingHTTPServer:
+    """Serve status on 127.0.0.1:port from a daemon thread; call shutdown() to stop."""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # noqa: A002
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path in ("", "/status"):
+                code, payload = 200, status.snapshot()
+            elif path == "/health":
+                ok = status.healthy()
+                code, payload = (200 if ok else 503), {"ok": ok}
+            else:
+                code, payload = 404, {"error": "not found"}
+            body = json.dumps(payload, sort_keys=True).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", int(port)), StatusHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="status-server", daemon=True).start()
+    return server